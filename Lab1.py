@@ -1,9 +1,13 @@
 import sys
 import numpy as np
-import numexpr as ne
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QPushButton, QMessageBox, QTextEdit, QRadioButton, QButtonGroup, QGroupBox, QGridLayout, QVBoxLayout, QHBoxLayout)
+from jobs import JobRunner
+from plots import Plot
+from nummeth import cache, metrics
+from nummeth.expr import CompileEquation
+from nummeth.roots import RootFinder
+from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QPushButton, QMessageBox, QTextEdit, QCheckBox, QRadioButton, QButtonGroup, QGroupBox, QGridLayout, QVBoxLayout, QHBoxLayout)
 
 class MainWindow(QWidget):
 
@@ -16,7 +20,6 @@ class MainWindow(QWidget):
 		self.setWindowTitle("Numerical solution of nonlinear equations")
 		self.setUpWindow()
 		self.BuildGraph()
-		self.show()
 
 	def setUpWindow(self):
 		equation_label = QLabel("Equation:", self)
@@ -60,6 +63,8 @@ class MainWindow(QWidget):
 		self.solveEquation = QPushButton("Solve Equation",self)
 		self.solveEquation.clicked.connect(self.FindRoot)
 
+		self.metrics_check = QCheckBox("Show metrics", self)
+
 		result_label = QLabel("Results:", self)
 
 		self.result_box = QTextEdit(self)
@@ -71,6 +76,17 @@ class MainWindow(QWidget):
 		self.canvas.setParent(self)
 
 		self.ax = self.fig.add_subplot(111)
+		self.plot = Plot(self.canvas, self.ax)
+
+		self.runner = JobRunner(self)
+		self.runner.progress.connect(self.RootProgress)
+		self.runner.finished.connect(self.ShowRoots)
+		self.runner.failed.connect(self.JobFailed)
+		self.runner.cancelled.connect(self.result_box.clear)
+		for edit in (self.equation_edit, self.a_edit, self.b_edit): #Changed inputs make a running search useless
+			edit.textChanged.connect(self.runner.Cancel)
+			edit.textChanged.connect(self.LiveGraph)
+		self.radiogroup.buttonClicked.connect(self.runner.Cancel)
 
 		left_layout = QVBoxLayout()
 		eq_row = QHBoxLayout()
@@ -94,7 +110,11 @@ class MainWindow(QWidget):
 		left_layout.addSpacing(6)
 		left_layout.addWidget(precision_box)
 		left_layout.addWidget(self.solveEquation)
-		left_layout.addWidget(result_label)
+		result_row = QHBoxLayout()
+		result_row.addWidget(result_label)
+		result_row.addStretch()
+		result_row.addWidget(self.metrics_check)
+		left_layout.addLayout(result_row)
 		left_layout.addWidget(self.result_box)
 
 		left_container = QWidget()
@@ -116,33 +136,88 @@ class MainWindow(QWidget):
 		if a >= b:
 			QMessageBox.warning(self, "Error", "'a' must be lower than 'b'", QMessageBox.StandardButton.Ok)
 			return
-		x = np.linspace(a, b, 100) #Creating an array with 100 points from a to b for graph
-		y = self.f(x)
+		if not self.EquationChange():
+			return
+		self.DrawFunction(a, b)
 
-		self.ax.clear()
-		self.ax.set_title(f"f(x) = x*tanh(x)-1")
-		self.ax.grid(True)
-		self.ax.plot(x, y)
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
-		self.canvas.draw()
+	def LiveGraph(self):
+		#Replots while the inputs are edited, unfinished input is skipped without warnings
+		try:
+			a = float(self.a_edit.text())
+			b = float(self.b_edit.text())
+			f = CompileEquation(self.equation_edit.text())
+		except ValueError:
+			return
+		if a < b:
+			self.f = f
+			self.DrawFunction(a, b)
 
-	def f(self, x):
-		return x*np.tanh(x)-1
+	def DrawFunction(self, a, b):
+		x = np.linspace(a, b, 100) #Creating an array with 100 points from a to b for graph
+		self.plot.Title(f"f(x) = {self.f.text}")
+		self.plot.Line("f", x, self.f(x), color="C0")
+		self.plot.Hide("roots")
+		self.plot.Update()
 
-	def derivative(self, x):
-		return (self.f(x + 1e-5) - self.f(x - 1e-5)) / (2 * (1e-5))
+	def EquationChange(self):
+		#Compiles the entered equation into self.f, compiled equations are cached by their text
+		try:
+			self.f = CompileEquation(self.equation_edit.text())
+		except ValueError as e:
+			QMessageBox.warning(self, "Error", f"Invalid equation: {e}", QMessageBox.StandardButton.Ok)
+			return False
+		return True
 
 	def FindRoot(self):
-		root_intervals = self.ShorteningRootIntervals()
-		res1 = self.IterationMethod(root_intervals)
-		res2 = self.DichotomyMethod(root_intervals)
-		res3 = self.NewtonsMethod(root_intervals)
+		try:
+			a = float(self.a_edit.text())
+			b = float(self.b_edit.text())
+		except ValueError:
+			QMessageBox.warning(self, "Error", "'a' and 'b' must be numbers", QMessageBox.StandardButton.Ok)
+			return
+		if not self.EquationChange():
+			return
+		self.partial = {}
+		self.result_box.setPlainText("Searching for roots...")
+		self.runner.Submit(self.RootJob, self.f, self.precision, a, b, self.metrics_check.isChecked())
+
+	def RootJob(self, f, precision, a, b, measure, progress):
+		#Runs on a worker thread, so it only uses its arguments. Measured runs skip the cache, the kernels must run.
+		finder = RootFinder(f, precision, progress)
+		with metrics.Collect(measure) as records:
+			result = cache.Cached("roots", {"f": f, "precision": precision, "a": a, "b": b},
+				lambda: finder.FindRoot(a, b), enabled=not measure)
+		return result, records
+
+	def RootProgress(self, kind, value):
+		self.partial[kind] = value
+		self.ShowRoots((self.partial, []))
+		if kind in ("dichotomy", "newton"):
+			self.plot.Line("roots", value, np.zeros(len(value)), "o", color="red")
+			self.plot.Update(rescale=False)
+
+	def ShowRoots(self, output):
+		result, records = output
+		self.result_box.clear()
+		if "intervals" in result:
+			self.result_box.append(f"Intervals with roots: {result['intervals']}")
+		if "iteration" in result:
+			self.result_box.append(f"\nRoots found using Iteration Method:\n{result['iteration']}")
+		if "dichotomy" in result:
+			self.result_box.append(f"\nRoots found using Dichotomy Method:\n{result['dichotomy']}")
+		if "newton" in result:
+			self.result_box.append(f"\nRoots found using Newton's Method:\n{result['newton']}")
+		if records:
+			self.result_box.append(f"\nMetrics:\n{metrics.FormatRecords(records)}")
+
+	def JobFailed(self, error):
+		QMessageBox.warning(self, "Error", f"The search failed: {error}", QMessageBox.StandardButton.Ok)
 		self.result_box.clear()
-		self.result_box.append(f"Intervals with roots: {root_intervals}")
-		self.result_box.append(f"\nRoots found using Iteration Method:\n{res1}")
-		self.result_box.append(f"\nRoots found using Dichotomy Method:\n{res2}")
-		self.result_box.append(f"\nRoots found using Newton's Method:\n{res3}")
+
+	def closeEvent(self, event):
+		self.runner.Cancel()
+		self.runner.Wait() #A job must not outlive its window, it stops at its next progress call
+		super().closeEvent(event)
 
 	def PrecisionChange(self):
 		if self.radio1.isChecked():
@@ -152,88 +227,8 @@ class MainWindow(QWidget):
 		else:
 			self.precision = 1e-8
 
-	def ShorteningRootIntervals(self):
-		#Shortens intervals with roots
-		step = 1 #First step
-		current_intervals = [(float(self.a_edit.text()), float(self.b_edit.text()))] #Borders
-
-		for i in range(2): #Two times shorts root intervals. First time step = 1.0, second step = 0.1
-			new_intervals = []
-			for (l, r) in current_intervals:
-				a1 = l
-				while a1 < r:
-					a2 = min(a1 + step, r) #Using min so it wouldn't go out of bonds
-					if self.f(a1) * self.f(a2) < 0: #Finds intervals on which sign changes
-						new_intervals.append((a1, a2)) #New interval adds to list
-					elif self.f(a1) == 0:
-						new_intervals.append((a1, a1))
-					elif self.f(a2) == 0:
-						new_intervals.append((a2, a2))
-					a1 = a2
-			current_intervals = new_intervals #Updating list for new cycle
-			step /= 10 #Shortens step from 1 to 0.1
-
-		return [(round(l, 2), round(r, 2)) for (l, r) in current_intervals]
-
-	def IterationMethod(self, intervals):
-		# digits = max(0, int(-np.log10(self.precision)))
-		roots = []
-		step = 0.01
-		while step >= self.precision:
-			new_intervals = []
-			current_roots = []
-			for (l, r) in intervals:
-				a1 = l
-				while a1 < r:
-					a2 = min(a1 + step, r)
-					if self.f(a1) * self.f(a2) < 0:
-						new_intervals.append((a1, a2))
-						current_roots.append((a1 + a2) / 2)
-						# current_roots.append(round(((a1 + a2) / 2), digits))
-					elif self.f(a1) == 0:
-						new_intervals.append((a1, a1))
-						current_roots.append((a1 + a1) / 2)
- 						# current_roots.append(round(((a1 + a1) / 2), digits))
-					elif self.f(a2) == 0:
-						new_intervals.append((a2, a2))
-						current_roots.append((a2 + a2) / 2)
- 						# current_roots.append(round(((a2 + a2) / 2), digits))
-					a1 = a2
-			intervals = new_intervals
-			roots = current_roots
-			step /= 10
-		return roots
-
-	def DichotomyMethod(self, intervals):
-		# digits = max(0, int(-np.log10(self.precision)))
-		roots = []
-		for (l, r) in intervals:
-			while abs(r - l) > self.precision:
-				c = (l + r) / 2 #Creates new point in the center of interval
-				if self.f(l) * self.f(c) < 0: #Finds which half contains root
-					r = c
-				else:
-					l = c
-			roots.append((l + r) / 2)
- 			# roots.append(round(((l + r) / 2), digits))
-		return roots
-
-	def NewtonsMethod(self, intervals):
-		# digits = max(0, int(-np.log10(self.precision)))
-		roots = []
-		for (l, r) in intervals:
-			x = l + self.precision
-			for i in range(50):
-				x_new = x - self.f(x) / self.derivative(x)
-				if abs(x_new - x) < self.precision or abs(self.f(x_new)) < self.precision:
-					x = x_new
-					break
-				x = x_new
-			roots.append(float(x))
- 			# roots.append(round(float(x), digits))
-		return roots
-
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	window = MainWindow()
+	window.show()
 	sys.exit(app.exec())
\ No newline at end of file
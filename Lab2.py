@@ -1,9 +1,13 @@
 import sys
 import numpy as np
-from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
+from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.patches as patches
+from jobs import JobRunner
+from plots import Plot
+from nummeth import cache, metrics
+from nummeth.expr import Compile
+from nummeth.integrals import Integrator, INTEGRALS
 
 class MainWindow(QWidget):
 
@@ -15,24 +19,13 @@ class MainWindow(QWidget):
 		self.setFixedSize(900, 600)
 		self.setWindowTitle("Numerical methods for calculating integrals")
 		self.SetUpWindow()
-		self.show()
 
 	def SetUpWindow(self):
 
 		integral_label = QLabel("Select Integral:")
 		self.integrals_box = QComboBox()
-		self.integrals_box.addItems([
-			"1/(sqrt(x**2+1))",
-			"cos(x)/(x+1)",
-			"1/(1.5*x**2+0.7)"
-			])
-
-		self.integral_funcs = [
-		lambda x: 1.0/np.sqrt(x**2 + 1.0),
-		lambda x: np.cos(x)/(x + 1.0),
-		lambda x: 1.0/(1.5*x**2 + 0.7)
-		]
-		self.integral = self.integral_funcs[self.integrals_box.currentIndex()]
+		self.integrals_box.setEditable(True) #Any integrand can be typed in
+		self.integrals_box.addItems([text for text, borders in INTEGRALS])
 		self.solve = False
 
 		integral_selection = QHBoxLayout()
@@ -63,6 +56,7 @@ class MainWindow(QWidget):
 		self.canvas.setParent(self)
 
 		self.ax = self.fig.add_subplot(111)
+		self.plot = Plot(self.canvas, self.ax)
 
 		divisions_box = QGroupBox("Select number of interval divisions:")
 		division_layout = QVBoxLayout()
@@ -109,12 +103,27 @@ class MainWindow(QWidget):
 		self.find_integral = QPushButton("Find Integral")
 		self.find_integral.clicked.connect(self.FindIntegral)
 
+		self.metrics_check = QCheckBox("Show metrics", self)
+
 		result_label = QLabel("Results:", self)
 
 		self.result_box = QTextEdit(self)
 		self.result_box.setReadOnly(True)
 		self.result_box.setPlaceholderText("Results will appear here...")
 
+		self.runner = JobRunner(self)
+		self.runner.progress.connect(self.IntegralProgress)
+		self.runner.finished.connect(self.ShowIntegral)
+		self.runner.failed.connect(self.JobFailed)
+		self.runner.cancelled.connect(self.result_box.clear)
+		self.integrals_box.currentTextChanged.connect(self.runner.Cancel) #Changed inputs make a running job useless
+		self.a_edit.textChanged.connect(self.runner.Cancel)
+		self.b_edit.textChanged.connect(self.runner.Cancel)
+		self.integrals_box.currentTextChanged.connect(self.LiveGraph)
+		self.a_edit.textChanged.connect(self.LiveGraph)
+		self.b_edit.textChanged.connect(self.LiveGraph)
+		self.division_group.buttonClicked.connect(self.runner.Cancel)
+
 		left_layout = QVBoxLayout()
 		left_layout.addLayout(integral_selection)
 		left_layout.addLayout(intervals_layout)
@@ -123,7 +132,11 @@ class MainWindow(QWidget):
 		left_layout.addWidget(divisions_box)
 		left_layout.addWidget(method_box)
 		left_layout.addWidget(self.find_integral)
-		left_layout.addWidget(result_label)
+		result_row = QHBoxLayout()
+		result_row.addWidget(result_label)
+		result_row.addStretch()
+		result_row.addWidget(self.metrics_check)
+		left_layout.addLayout(result_row)
 		left_layout.addWidget(self.result_box)
 		left_container = QWidget()
 		left_container.setLayout(left_layout)
@@ -136,11 +149,19 @@ class MainWindow(QWidget):
 
 	def IntegralChange(self):
 		index = self.integrals_box.currentIndex()
-		self.integral = self.integral_funcs[index]
-		border_a = ("0.2", "0.6", "1.4")
-		border_b = ("1.2", "1.4", "2.6")
-		self.a_edit.setText(border_a[index])
-		self.b_edit.setText(border_b[index])
+		if 0 <= index < len(INTEGRALS): #Entered integrands keep the current borders
+			border_a, border_b = INTEGRALS[index][1]
+			self.a_edit.setText(str(border_a))
+			self.b_edit.setText(str(border_b))
+
+	def CompileIntegral(self):
+		#Compiles the integrand into self.integral, compiled integrands are cached by their text
+		try:
+			self.integral = Compile(self.integrals_box.currentText())
+		except ValueError as e:
+			QMessageBox.warning(self, "Error", f"Invalid integrand: {e}", QMessageBox.StandardButton.Ok)
+			return False
+		return True
 
 	def DivisionChange(self):
 		checked = self.division_group.checkedButton()
@@ -169,101 +190,138 @@ class MainWindow(QWidget):
 		if a >= b:
 			QMessageBox.warning(self, "Error", "'a' must be lower than 'b'", QMessageBox.StandardButton.Ok)
 			return
+		if not self.CompileIntegral():
+			return
+		self.DrawIntegral(a, b)
+
+	def LiveGraph(self):
+		#Replots while the inputs are edited, unfinished input is skipped without warnings
+		try:
+			a = float(self.a_edit.text())
+			b = float(self.b_edit.text())
+			integral = Compile(self.integrals_box.currentText())
+		except ValueError:
+			return
+		if a < b:
+			self.integral = integral
+			self.solve = False
+			self.DrawIntegral(a, b)
+
+	def DrawIntegral(self, a, b):
 		pad = 0.3
-		a1 = a - 0.3
-		b1 = b + 0.3
-		x = np.linspace(a1, b1, 100)
-		y = self.f(x)
-
-		self.ax.clear()
-		self.ax.set_title(f"f(x) = {self.integrals_box.currentText()}")
-		self.ax.grid(True)
-		self.ax.plot(x, y)
-		self.ax.axvline(a, color = "red", linestyle="--", linewidth=1.2)
-		self.ax.axvline(b, color = "red", linestyle="--", linewidth=1.2)
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
+		x = np.linspace(a - pad, b + pad, 100)
+		self.plot.Title(f"f(x) = {self.integral.text}")
+		self.plot.Line("f", x, self.f(x), color="C0")
+		self.plot.VLine("a", a, color="red", linestyle="--", linewidth=1.2)
+		self.plot.VLine("b", b, color="red", linestyle="--", linewidth=1.2)
+		self.plot.Hide("areas", "box", "hits", "misses")
 		if self.solve:
-			if self.method=="Rectangle":
-				step = (float(self.b_edit.text()) - float(self.a_edit.text())) / self.division
-				for m, h in zip(self.mids, self.heights):
-					a0 = m - 0.5 * step
-					y0 = min(0, h)
-					height = abs(h)
-					rect = patches.Rectangle((a0, y0), step, height, linewidth=0.1, edgecolor='black', facecolor='green', alpha=0.45)
-					self.ax.add_patch(rect)
-			if self.method=="Trapezoid":
-				step = (float(self.b_edit.text()) - float(self.a_edit.text())) / self.division
-				for i in range(self.division):
-					verts = [(a, 0.0), (a, self.f(a)), (a+step, self.f(a+step)), (a+step, 0.0)]
-					trapezoid = patches.Polygon(verts, closed=True, linewidth=0.1, edgecolor='black', facecolor='green', alpha=0.45)
-					self.ax.add_patch(trapezoid)
-					a += step
+			step = (b - a) / self.division
+			style = {"linewidth": 0.1, "edgecolor": "black", "facecolor": "green", "alpha": 0.45}
+			if self.method == "Rectangle":
+				left = self.drawn["mids"] - 0.5 * step
+				height = self.drawn["heights"]
+				self.plot.Polygons("areas", self.Quads(left, left + step, height, height), **style)
+			if self.method == "Trapezoid":
+				nodes = a + step * np.arange(self.division + 1)
+				values = np.broadcast_to(self.f(nodes), nodes.shape)
+				self.plot.Polygons("areas", self.Quads(nodes[:-1], nodes[1:], values[:-1], values[1:]), **style)
 			if self.method == "Monte-Carlo":
-				rect = patches.Rectangle((a, 0), (b - a), (self.y_max - 0), linewidth=1.0, edgecolor='blue', facecolor='none', linestyle='--')
-				self.ax.add_patch(rect)
-				self.ax.scatter(self.x_dots[self.hits], self.y_dots[self.hits], s=8, alpha=0.6)
-				self.ax.scatter(self.x_dots[~self.hits], self.y_dots[~self.hits], s=8, alpha=0.6)
-		self.canvas.draw()
+				y_max, x_dots, y_dots, hits = (self.drawn[key] for key in ("y_max", "x_dots", "y_dots", "hits"))
+				self.plot.Line("box", [a, a, b, b, a], [0, y_max, y_max, 0, 0], "--", color="blue", linewidth=1.0)
+				self.plot.Scatter("hits", x_dots[hits], y_dots[hits], s=8, alpha=0.6, color="C0")
+				self.plot.Scatter("misses", x_dots[~hits], y_dots[~hits], s=8, alpha=0.6, color="C1")
+		self.plot.Update()
 		self.solve = False
 
+	def Quads(self, x_left, x_right, y_left, y_right):
+		#Vertices of the quadrilaterals between the x axis and the given heights, one (4, 2) array per division
+		zero = np.zeros(len(x_left))
+		return np.stack((
+			np.column_stack((x_left, zero)),
+			np.column_stack((x_left, y_left)),
+			np.column_stack((x_right, y_right)),
+			np.column_stack((x_right, zero)),
+		), axis=1)
+
 	def FindIntegral(self):
+		try:
+			a = float(self.a_edit.text())
+			b = float(self.b_edit.text())
+		except ValueError:
+			QMessageBox.warning(self, "Error", "'a' and 'b' must be numbers", QMessageBox.StandardButton.Ok)
+			return
+		if not self.CompileIntegral():
+			return
+		self.partial = {}
+		self.interval = (a, b, self.division)
+		self.result_box.setPlainText("Integrating...")
+		self.runner.Submit(self.IntegralJob, self.integral, a, b, self.division, self.metrics_check.isChecked())
+
+	def IntegralJob(self, integral, a, b, division, measure, progress):
+		#Runs on a worker thread, so it only uses its arguments. Measured runs skip the cache, the kernels must run.
+		#Only the rectangle and trapezoid rules are cached, Monte-Carlo draws new dots on every run.
+		integrator = Integrator(integral, a, b, division, progress)
+		with metrics.Collect(measure) as records:
+			rules = cache.Cached("integral/rules", {"f": integral, "a": a, "b": b, "division": division},
+				lambda: self.Rules(integrator), enabled=not measure)
+			monte_carlo = integrator.MonteCarlo()
+		result = {"Rectangle": rules["Rectangle"], "Trapezoid": rules["Trapezoid"], "Monte-Carlo": monte_carlo}
+		drawn = {
+			"mids": rules["mids"],
+			"heights": rules["heights"],
+			"y_max": integrator.y_max,
+			"x_dots": integrator.x_dots,
+			"y_dots": integrator.y_dots,
+			"hits": integrator.hits,
+		}
+		return drawn, result, records
+
+	def Rules(self, integrator):
+		#Integrals of the deterministic rules and the rectangles the graph draws
+		return {
+			"Rectangle": integrator.RectangleMethod(),
+			"Trapezoid": integrator.TrapezoidMethod(),
+			"mids": np.array(integrator.mids),
+			"heights": np.array(integrator.heights),
+		}
+
+	def IntegralProgress(self, method, value):
+		#Integral over [a, x] while a method goes, the full one when it is done
+		x, s = value
+		self.partial[method] = s if x == self.interval[1] else f"{s} (over [{self.interval[0]}, {x:.6g}])"
+		self.ShowResult(self.partial, [])
+
+	def ShowIntegral(self, output):
+		self.drawn, result, records = output
 		self.solve = True
-		res1 = self.RectangleMethod()
-		res2 = self.TrapezoidMethod()
-		res3 = self.MonteCarlo()
 		self.BuildGraph()
+		self.ShowResult(result, records)
+
+	def ShowResult(self, result, records):
+		a, b, division = self.interval
+		self.result_box.clear()
+		self.result_box.append(f"Interval {a} - {b} with {division} divisions")
+		if "Rectangle" in result:
+			self.result_box.append(f"\nIntegral found using Rectangle Method:\n{result['Rectangle']}")
+		if "Trapezoid" in result:
+			self.result_box.append(f"\nIntegral found using Trapezoid Method:\n{result['Trapezoid']}")
+		if "Monte-Carlo" in result:
+			self.result_box.append(f"\nIntegral found using Monte-Carlo Method:\n{result['Monte-Carlo']}")
+		if records:
+			self.result_box.append(f"\nMetrics:\n{metrics.FormatRecords(records)}")
+
+	def JobFailed(self, error):
+		QMessageBox.warning(self, "Error", f"The integration failed: {error}", QMessageBox.StandardButton.Ok)
 		self.result_box.clear()
-		self.result_box.append(f"Interval {float(self.a_edit.text())} - {float(self.b_edit.text())} with {self.division} divisions")
-		self.result_box.append(f"\nIntegral found using Rectangle Method:\n{res1}")
-		self.result_box.append(f"\nIntegral found using Trapezoid Method:\n{res2}")
-		self.result_box.append(f"\nIntegral found using Monte-Carlo Method:\n{res3}")
-
-	def RectangleMethod(self):
-		a = float(self.a_edit.text())
-		b = float(self.b_edit.text())
-		step = (b - a) / self.division
-		s = 0
-		self.mids = []
-		self.heights = []
-		for i in range(self.division):
-			rect = a + step / 2
-			s += self.f(rect) * step
-			self.mids.append(rect)
-			self.heights.append(self.f(rect))
-			a += step
-		return s
-
-	def TrapezoidMethod(self):
-		a = float(self.a_edit.text())
-		b = float(self.b_edit.text())
-		step = (b - a) / self.division
-		s = 0
-		for i in range(self.division):
-			s += 0.5 * (self.f(a) + self.f(a+step)) * step
-			a += step
-		return s
-
-	def FindMaxValue(self):
-		a = float(self.a_edit.text())
-		b = float(self.b_edit.text())
-		xs = np.linspace(a, b, 100000)
-		y = np.array([self.f(x) for x in xs])
-		return y.max()
-
-	def MonteCarlo(self):
-		a = float(self.a_edit.text())
-		b = float(self.b_edit.text())		
-		self.y_max = self.FindMaxValue()
-		self.x_dots = np.random.uniform(a, b, self.division)
-		self.y_dots = np.random.uniform(0, self.y_max, self.division)
-		dots = np.array([self.f(x) for x in self.x_dots])
-		self.hits = (self.y_dots <= dots)
-		count = np.count_nonzero(self.hits)
-		s = (count/self.division) * ((b-a)*self.y_max)
-		return s
+
+	def closeEvent(self, event):
+		self.runner.Cancel()
+		self.runner.Wait() #A job must not outlive its window, it stops at its next progress call
+		super().closeEvent(event)
 
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	window = MainWindow()
+	window.show()
 	sys.exit(app.exec())
\ No newline at end of file
@@ -1,8 +1,12 @@
 import sys
 import numpy as np
-from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
+from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from jobs import JobRunner
+from plots import Plot
+from nummeth import metrics
+from nummeth.regression import least_squares
 
 class MainWindow(QWidget):
 
@@ -14,7 +18,6 @@ class MainWindow(QWidget):
 		self.setFixedSize(900, 600)
 		self.setWindowTitle("Least squares method for linear regression")
 		self.SetUpWindow()
-		self.show()
 
 	def SetUpWindow(self):
 
@@ -28,11 +31,23 @@ class MainWindow(QWidget):
 		self.build_regression = QPushButton("Build linear regression")
 		self.build_regression.clicked.connect(self.BuildRegression)
 
+		self.metrics_check = QCheckBox("Show metrics", self)
+		self.metrics_box = QTextEdit(self)
+		self.metrics_box.setReadOnly(True)
+		self.metrics_box.setPlaceholderText("Metrics will appear here...")
+
 		self.fig = Figure(figsize=(5, 5), dpi=100)
 		self.canvas = FigureCanvas(self.fig)
 		self.canvas.setParent(self)
 
 		self.ax = self.fig.add_subplot(111)
+		self.plot = Plot(self.canvas, self.ax)
+
+		self.runner = JobRunner(self)
+		self.runner.finished.connect(self.ShowRegression)
+		self.runner.failed.connect(self.JobFailed)
+		self.x_edit.textChanged.connect(self.runner.Cancel) #Changed inputs make a running job useless
+		self.y_edit.textChanged.connect(self.runner.Cancel)
 
 		x_layout = QHBoxLayout()
 		x_layout.addWidget(x_label)
@@ -52,7 +67,8 @@ class MainWindow(QWidget):
 		left_layout = QVBoxLayout()
 		left_layout.addWidget(dots_group)
 		left_layout.addWidget(self.build_regression)
-		left_layout.addStretch(1)
+		left_layout.addWidget(self.metrics_check)
+		left_layout.addWidget(self.metrics_box)
 
 		left_container = QWidget()
 		left_container.setLayout(left_layout)
@@ -74,32 +90,34 @@ class MainWindow(QWidget):
 			QMessageBox.warning(self, "Error", "'x' and 'y' must have the same number of coords", QMessageBox.StandardButton.Ok)
 			return
 
-		k, b = self.least_squares(x_cords, y_cords)
-		x_line = [x_cords[0], x_cords[-1]]
-		y_line = [k * x_cords[0] + b, k * x_cords[-1] + b]
+		self.runner.Submit(self.RegressionJob, x_cords, y_cords, self.metrics_check.isChecked())
 
-		self.ax.clear()
-		self.ax.grid(True)
-		self.ax.scatter(x_cords, y_cords, s=20, alpha=0.8)
-		self.ax.plot(x_line, y_line, color="red", linewidth=2)
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
-		self.canvas.draw()
+	def RegressionJob(self, x_cords, y_cords, measure, progress):
+		#Runs on a worker thread, so it only uses its arguments
+		with metrics.Collect(measure) as records:
+			k, b = least_squares(x_cords, y_cords)
+		return x_cords, y_cords, k, b, records
 
-	def least_squares(self, x, y):
-		n = len(x)
-		sum_x = sum(x)
-		sum_y = sum(y)
-		sum_xy = sum(x[i] * y[i] for i in range(n))
-		sum_x2 = sum(x[i] * x[i] for i in range(n))
+	def ShowRegression(self, output):
+		x_cords, y_cords, k, b, records = output
+		self.metrics_box.setPlainText(metrics.FormatRecords(records))
+		x_line = [x_cords[0], x_cords[-1]]
+		y_line = [k * x_cords[0] + b, k * x_cords[-1] + b]
 
-		k = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x * sum_x)
-		b = (sum_y - k * sum_x) / n
+		self.plot.Scatter("points", x_cords, y_cords, s=20, alpha=0.8, color="C0")
+		self.plot.Line("fit", x_line, y_line, color="red", linewidth=2)
+		self.plot.Update()
 
-		return k, b
+	def JobFailed(self, error):
+		QMessageBox.warning(self, "Error", f"The regression failed: {error}", QMessageBox.StandardButton.Ok)
 
+	def closeEvent(self, event):
+		self.runner.Cancel()
+		self.runner.Wait() #A job must not outlive its window, it stops at its next progress call
+		super().closeEvent(event)
 
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	window = MainWindow()
+	window.show()
 	sys.exit(app.exec())
\ No newline at end of file
@@ -1,8 +1,13 @@
 import sys
 import numpy as np
-from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
+from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from jobs import JobRunner
+from plots import Plot
+from nummeth import metrics
+from nummeth.expr import Compile
+from nummeth.interpolation import LagrangePolynomial, EquidistantNodes
 
 class MainWindow(QWidget):
 
@@ -14,7 +19,6 @@ class MainWindow(QWidget):
 		self.setFixedSize(900, 600)
 		self.setWindowTitle("Lagrange Polynomial for function interpolation")
 		self.SetUpWindow()
-		self.show()
 
 	def SetUpWindow(self):
 		func_label = QLabel("Function:")
@@ -44,11 +48,25 @@ class MainWindow(QWidget):
 		self.polynomial_graph = QPushButton("Build Lagrange Polynomial")
 		self.polynomial_graph.clicked.connect(self.BuildPolynomial)
 
+		self.metrics_check = QCheckBox("Show metrics", self)
+		self.metrics_box = QTextEdit(self)
+		self.metrics_box.setReadOnly(True)
+		self.metrics_box.setPlaceholderText("Metrics will appear here...")
+
 		self.fig = Figure(figsize=(5, 5), dpi=100)
 		self.canvas = FigureCanvas(self.fig)
 		self.canvas.setParent(self)
 
 		self.ax = self.fig.add_subplot(111)
+		self.plot = Plot(self.canvas, self.ax)
+
+		self.runner = JobRunner(self)
+		self.runner.finished.connect(self.ShowPolynomial)
+		self.runner.failed.connect(self.JobFailed)
+		for edit in (self.func_edit, self.xmin_edit, self.xmax_edit, self.a_edit, self.b_edit): #Changed inputs make a running job useless
+			edit.textChanged.connect(self.runner.Cancel)
+		for edit in (self.func_edit, self.xmin_edit, self.xmax_edit):
+			edit.textChanged.connect(self.LiveGraph)
 
 		func_layout = QHBoxLayout()
 		func_layout.addWidget(func_label)
@@ -78,7 +96,8 @@ class MainWindow(QWidget):
 		left_layout.addWidget(borders_group)
 		left_layout.addWidget(self.build_graph)
 		left_layout.addWidget(self.polynomial_graph)
-		left_layout.addStretch(1)
+		left_layout.addWidget(self.metrics_check)
+		left_layout.addWidget(self.metrics_box)
 
 		left_container = QWidget()
 		left_container.setLayout(left_layout)
@@ -89,10 +108,14 @@ class MainWindow(QWidget):
 		main_layout.addWidget(self.canvas, 1)
 		self.setLayout(main_layout)
 
-	def f(self, x):
-		# return 2*(x*x)-1
-		# return np.exp(x)
-		return np.sin(x)
+	def FunctionChange(self):
+		#Compiles the entered function into self.f, compiled functions are cached by their text
+		try:
+			self.f = Compile(self.func_edit.text())
+		except ValueError as e:
+			QMessageBox.warning(self, "Error", f"Invalid function: {e}", QMessageBox.StandardButton.Ok)
+			return False
+		return True
 
 	def BuildGraph(self):
 		try:
@@ -104,50 +127,66 @@ class MainWindow(QWidget):
 		if xmin >= xmax:
 			QMessageBox.warning(self, "Error", "'xmin' must be lower than 'xmax'", QMessageBox.StandardButton.Ok)
 			return
+		if not self.FunctionChange():
+			return
+		self.DrawFunction(xmin, xmax)
+
+	def LiveGraph(self):
+		#Replots while the inputs are edited, unfinished input is skipped without warnings
+		try:
+			xmin = float(self.xmin_edit.text())
+			xmax = float(self.xmax_edit.text())
+			f = Compile(self.func_edit.text())
+		except ValueError:
+			return
+		if xmin < xmax:
+			self.f = f
+			self.DrawFunction(xmin, xmax)
+
+	def DrawFunction(self, xmin, xmax):
 		x = np.linspace(xmin, xmax, 100)
-		y = self.f(x)
-
-		self.ax.clear()
-		self.ax.set_title(f"f(x) = sin(x)")
-		self.ax.grid(True)
-		self.ax.plot(x, y)
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
-		self.canvas.draw()
-
-	def LagrangePolynomial(self, x, x_nodes, y_nodes):
-		n = len(x_nodes)
-		L = np.zeros_like(x, dtype=float)
-
-		for i in range(n):
-			li = np.ones_like(x, dtype=float)
-			for j in range(n):
-				if i != j:
-					li *= (x - x_nodes[j]) / (x_nodes[i] - x_nodes[j])
-			L += y_nodes[i] * li
-		return L
+		self.plot.Title(f"f(x) = {self.f.text}")
+		self.plot.Line("f", x, self.f(x), color="C0")
+		self.plot.Hide("lagrange", "nodes")
+		self.plot.Update()
 
 	def BuildPolynomial(self):
 		xmin = float(self.xmin_edit.text())
 		xmax = float(self.xmax_edit.text())
 		a = float(self.a_edit.text())
 		b = float(self.b_edit.text())
-		h = (b - a) / 10
+		if not self.FunctionChange():
+			return
+		self.runner.Submit(self.PolynomialJob, self.f, xmin, xmax, a, b, self.metrics_check.isChecked())
+
+	def PolynomialJob(self, f, xmin, xmax, a, b, measure, progress):
+		#Runs on a worker thread, so it only uses its arguments
 		x = np.linspace(xmin, xmax, 400)
-		x_nodes = np.array([a + i * h for i in range(11)])
-		y_nodes = self.f(x_nodes)
-		y_lagrange = self.LagrangePolynomial(x, x_nodes, y_nodes)
-		self.ax.clear()
-		self.ax.grid(True)
-		self.ax.plot(x, self.f(x), label="f(x)")
-		self.ax.plot(x, y_lagrange, "--", label="Lagrange polynomial")
-		self.ax.scatter(x_nodes, y_nodes, color="red", zorder=5, label="Interpolation nodes")
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
-
-		self.canvas.draw()
+		x_nodes = EquidistantNodes(a, b, 11)
+		y_nodes = f(x_nodes)
+		with metrics.Collect(measure) as records:
+			y_lagrange = LagrangePolynomial(x, x_nodes, y_nodes)
+		return x, f(x), x_nodes, y_nodes, y_lagrange, records
+
+	def ShowPolynomial(self, output):
+		x, y, x_nodes, y_nodes, y_lagrange, records = output
+		self.metrics_box.setPlainText(metrics.FormatRecords(records))
+		self.plot.Title(f"f(x) = {self.f.text}")
+		self.plot.Line("f", x, y, color="C0", label="f(x)")
+		self.plot.Line("lagrange", x, y_lagrange, "--", color="C1", label="Lagrange polynomial")
+		self.plot.Scatter("nodes", x_nodes, y_nodes, color="red", zorder=5, label="Interpolation nodes")
+		self.plot.Update()
+
+	def JobFailed(self, error):
+		QMessageBox.warning(self, "Error", f"The interpolation failed: {error}", QMessageBox.StandardButton.Ok)
+
+	def closeEvent(self, event):
+		self.runner.Cancel()
+		self.runner.Wait() #A job must not outlive its window, it stops at its next progress call
+		super().closeEvent(event)
 
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	window = MainWindow()
+	window.show()
 	sys.exit(app.exec())
\ No newline at end of file
@@ -1,26 +1,31 @@
 import sys
+import time
 import numpy as np
-from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
+from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QGroupBox, QRadioButton, QButtonGroup, QMessageBox
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from jobs import JobRunner
+from plots import Plot
+from nummeth import ode, study, cache, metrics
+from nummeth.expr import Compile, Differentiate, SameExpression
+from nummeth.ode import ODESolver, METHOD_NAMES
 
 class MainWindow(QWidget):
 
 	def __init__(self):
 		super().__init__()
+		self.events = [] #Events registered with AddEvent, checked by every method
 		self.InitializeUI()
 
 	def InitializeUI(self):
 		self.setFixedSize(900, 600)
 		self.setWindowTitle("Numerical solution of ordinary differential equations")
 		self.SetUpWindow()
-		self.show()
 
 	def SetUpWindow(self):
 		func_label = QLabel("Function y':")
 		self.func_edit = QLineEdit(self)
 		self.func_edit.setText("(y*y-y)/x")
-		self.func_edit.setReadOnly(True)
 
 		borders_group = QGroupBox("Set initial conditions:")
 
@@ -45,28 +50,104 @@ class MainWindow(QWidget):
 		self.h_edit.setText("0.1")
 
 		method_box = QGroupBox("Select method")
-		method_layout = QVBoxLayout()
+		method_layout = QGridLayout()
 		self.radio1 = QRadioButton("Euler Method", self)
 		self.radio1.setChecked(True)
 		self.radio2 = QRadioButton("Runge–Kutta 4", self)
-		method_layout.addWidget(self.radio1)
-		method_layout.addWidget(self.radio2)
-		method_box.setLayout(method_layout)
+		self.radio3 = QRadioButton("Dormand–Prince 4(5)", self)
+		self.radio4 = QRadioButton("Backward Euler", self)
+		self.radio5 = QRadioButton("Crank–Nicolson", self)
+		self.radio6 = QRadioButton("BDF (orders 1-5)", self)
+		method_layout.addWidget(self.radio1, 0, 0) #Explicit methods on the left
+		method_layout.addWidget(self.radio2, 1, 0)
+		method_layout.addWidget(self.radio3, 2, 0)
+		method_layout.addWidget(self.radio4, 0, 1) #Implicit methods on the right
+		method_layout.addWidget(self.radio5, 1, 1)
+		method_layout.addWidget(self.radio6, 2, 1)
 
 		self.method_group = QButtonGroup()
 		self.method_group.addButton(self.radio1)
 		self.method_group.addButton(self.radio2)
+		self.method_group.addButton(self.radio3)
+		self.method_group.addButton(self.radio4)
+		self.method_group.addButton(self.radio5)
+		self.method_group.addButton(self.radio6)
 		self.method_group.buttonClicked.connect(self.MethodChange)
 		self.MethodChange()
 
+		jacobian_label = QLabel("Jacobian:")
+		self.jacobian_box = QComboBox()
+		self.jacobian_box.addItems(["Analytic", "Finite differences"])
+		method_layout.addWidget(jacobian_label, 3, 0)
+		method_layout.addWidget(self.jacobian_box, 3, 1)
+		method_box.setLayout(method_layout)
+
+		tol_group = QGroupBox("Tolerances and events:")
+
+		atol_label = QLabel("atol:")
+		self.atol_edit = QLineEdit(self)
+		self.atol_edit.setText("1e-6")
+
+		rtol_label = QLabel("rtol:")
+		self.rtol_edit = QLineEdit(self)
+		self.rtol_edit.setText("1e-6")
+
+		tol_layout = QHBoxLayout()
+		tol_layout.addWidget(atol_label)
+		tol_layout.addWidget(self.atol_edit)
+		tol_layout.addWidget(rtol_label)
+		tol_layout.addWidget(self.rtol_edit)
+
+		stop_label = QLabel("Stop at |y| >=")
+		self.stop_edit = QLineEdit(self)
+		self.stop_edit.setText("1e6")
+
+		level_label = QLabel("Record y =")
+		self.level_edit = QLineEdit(self)
+		self.level_edit.setPlaceholderText("level")
+
+		events_layout = QHBoxLayout()
+		events_layout.addWidget(stop_label)
+		events_layout.addWidget(self.stop_edit)
+		events_layout.addWidget(level_label)
+		events_layout.addWidget(self.level_edit)
+
+		tol_events_layout = QVBoxLayout()
+		tol_events_layout.addLayout(tol_layout)
+		tol_events_layout.addLayout(events_layout)
+		tol_group.setLayout(tol_events_layout)
+
 		self.build_graph = QPushButton("Build function")
 		self.build_graph.clicked.connect(self.BuildGraph)
 
+		self.run_study = QPushButton("Convergence study (Euler vs RK4)")
+		self.run_study.clicked.connect(self.RunStudy)
+
+		self.metrics_check = QCheckBox("Show metrics", self)
+
+		result_label = QLabel("Results:", self)
+
+		self.result_box = QTextEdit(self)
+		self.result_box.setReadOnly(True)
+		self.result_box.setPlaceholderText("Results will appear here...")
+
 		self.fig = Figure(figsize=(5, 5), dpi=100)
 		self.canvas = FigureCanvas(self.fig)
 		self.canvas.setParent(self)
 
 		self.ax = self.fig.add_subplot(111)
+		self.plot = Plot(self.canvas, self.ax)
+
+		self.runner = JobRunner(self)
+		self.runner.progress.connect(self.SolveProgress)
+		self.runner.finished.connect(self.JobFinished)
+		self.runner.failed.connect(self.JobFailed)
+		self.runner.cancelled.connect(self.result_box.clear)
+		for edit in (self.func_edit, self.x0_edit, self.y_x0_edit, self.a_edit, self.b_edit, self.h_edit,
+			self.atol_edit, self.rtol_edit, self.stop_edit, self.level_edit): #Changed inputs make a running job useless
+			edit.textChanged.connect(self.runner.Cancel)
+		self.method_group.buttonClicked.connect(self.runner.Cancel)
+		self.jacobian_box.currentIndexChanged.connect(self.runner.Cancel)
 
 		func_layout = QHBoxLayout()
 		func_layout.addWidget(func_label)
@@ -84,9 +165,15 @@ class MainWindow(QWidget):
 		down_layout.addWidget(b_label)
 		down_layout.addWidget(self.b_edit)
 
+		self.stream_check = QCheckBox("Stream to:", self)
+		self.stream_edit = QLineEdit(self)
+		self.stream_edit.setText("lab6_solution.npy")
+
 		h_layout = QHBoxLayout()
 		h_layout.addWidget(h_label)
 		h_layout.addWidget(self.h_edit)
+		h_layout.addWidget(self.stream_check)
+		h_layout.addWidget(self.stream_edit)
 
 		group_layout = QVBoxLayout()
 		group_layout.addLayout(up_layout)
@@ -100,12 +187,20 @@ class MainWindow(QWidget):
 		left_layout.addSpacing(6)
 		left_layout.addWidget(borders_group)
 		left_layout.addWidget(method_box)
+		left_layout.addWidget(tol_group)
 		left_layout.addWidget(self.build_graph)
-		left_layout.addStretch(1)
+		left_layout.addWidget(self.run_study)
+		result_row = QHBoxLayout()
+		result_row.addWidget(result_label)
+		result_row.addStretch()
+		result_row.addWidget(self.metrics_check)
+		left_layout.addLayout(result_row)
+		left_layout.addWidget(self.result_box)
 
 		left_container = QWidget()
 		left_container.setLayout(left_layout)
 		left_container.setMinimumWidth(320)
+		left_container.setMaximumWidth(400)
 		
 		main_layout = QHBoxLayout()
 		main_layout.addWidget(left_container)
@@ -114,17 +209,15 @@ class MainWindow(QWidget):
 
 	def MethodChange(self):
 		checked = self.method_group.checkedButton()
-		if checked == self.radio1:
-			self.method = 1
-		else:
-			self.method = 2
-
-	def f(self, x, y):
-		return (y * y - y) / x
-
-	def exact_solution(self, x, x0, y0):
-		C = (1 - 1 / y0) / x0
-		return 1 / (1 - C * x)
+		methods = {
+			self.radio1: 1,
+			self.radio2: 2,
+			self.radio3: 3,
+			self.radio4: 4,
+			self.radio5: 5,
+			self.radio6: 6,
+		}
+		self.method = methods.get(checked)
 
 	def BuildGraph(self):
 		try:
@@ -138,56 +231,218 @@ class MainWindow(QWidget):
 		if a >= b:
 			QMessageBox.warning(self, "Error", "'a' must be lower than 'b'", QMessageBox.StandardButton.Ok)
 			return
-		x, y = self.Solve()
-
-		x_exact = np.linspace(a, b, 400)
-		y_exact = self.exact_solution(x_exact, x0, y0)
-
-		self.ax.clear()
-		self.ax.set_title(f"y(x) = (y*y-y)/x")
-		self.ax.grid(True)
-		self.ax.plot(x, y, '-', label="Euler method")
-		self.ax.plot(x_exact, y_exact, '-', label="Exact solution")
-		self.ax.axhline(0, color="black", linewidth=1.0)
-		self.ax.axvline(0, color="black", linewidth=1.0)
+		if self.stream_check.isChecked() and self.method not in (1, 2):
+			QMessageBox.warning(self, "Error", "Streaming is available for Euler and Runge–Kutta 4 only", QMessageBox.StandardButton.Ok)
+			return
+		if not self.FunctionChange():
+			return
+		try:
+			self.Solve()
+		except ValueError:
+			QMessageBox.warning(self, "Error", "'h', 'atol' and 'rtol' must be positive numbers, event levels must be numbers", QMessageBox.StandardButton.Ok)
+			return
+
+		#The trajectory is drawn while it is computed, the full plot replaces it at the end
+		self.ResetAxes()
+		self.plot.Title(f"y' = {self.f.text}")
+		self.plot.XLim(a, b)
+		self.plot.Hide("steps", "exact")
+		self.live_x = [np.array([x0])]
+		self.live_y = [np.array([y0])]
+		self.plot.Line("solution", [x0], [y0], color="C0", marker="None")
+		self.plot.Update(scalex=False)
+		self.live_drawn = time.perf_counter()
+		self.result_box.setPlainText("Solving...")
+
+	def ResetAxes(self):
+		if len(self.fig.axes) != 1: #The study replaced the axes
+			self.fig.clear()
+			self.ax = self.fig.add_subplot(111)
+			self.plot = Plot(self.canvas, self.ax)
+
+	def SolveProgress(self, kind, value):
+		x, y = value
+		self.live_x.append(x)
+		self.live_y.append(y)
+		if time.perf_counter() - self.live_drawn > 0.1: #Redrawing for every piece would slow the window down
+			x, y = self.Thin(np.concatenate(self.live_x), np.concatenate(self.live_y))
+			self.plot.Line("solution", x, y)
+			self.plot.Update(scalex=False) #Blitted unless the y limits grow
+			self.live_drawn = time.perf_counter()
+
+	def Thin(self, x, y, max_points=4000):
+		#Every k-th point and the last one, a few thousand points are enough on screen
+		step = max(1, len(x) // max_points)
+		if step == 1:
+			return x, y
+		return np.append(x[::step], x[-1]), np.append(y[::step], y[-1])
+
+	def JobFinished(self, output):
+		kind, result = output
+		if kind == "solution":
+			self.ShowSolution(result)
+		else:
+			self.ShowStudy(result)
+
+	def ShowSolution(self, result):
+		self.stats, x, y, y_dense, self.records = result
+		a = float(self.a_edit.text())
+		b = float(self.b_edit.text())
+		x0 = float(self.x0_edit.text())
+		y0 = float(self.y_x0_edit.text())
+
+		self.ResetAxes()
+		self.plot.Title(f"y' = {self.f.text}")
+		self.plot.XLim()
+		self.plot.Hide("steps", "exact")
+		if self.method == 3:
+			#Adaptive steps are sparse, so the curve is drawn from the dense output
+			self.plot.Line("solution", np.linspace(x[0], x[-1], len(y_dense)), y_dense, color="C0", marker="None")
+			self.plot.Line("steps", x, y, "o", markersize=3, color="C2")
+		elif self.method == 6:
+			self.plot.Line("solution", x, y, color="C0", marker="o", markersize=3)
+		else:
+			self.plot.Line("solution", *self.Thin(x, y), color="C0", marker="None")
+		if self.IsDefaultProblem(): #The exact solution is only known for the default equation
+			x_exact = np.linspace(a, b, 400)
+			self.plot.Line("exact", x_exact, ode.exact_solution(x_exact, x0, y0), color="C1")
+		self.plot.Update()
+
+		self.result_box.clear()
+		self.result_box.append(f"Method: {METHOD_NAMES[self.method]}")
+		self.result_box.append(f"Accepted steps: {self.stats['accepted']}")
+		self.result_box.append(f"Rejected steps: {self.stats['rejected']}")
+		self.result_box.append(f"RHS evaluations: {self.stats['nfev']}")
+		if self.method >= 4:
+			self.result_box.append(f"Jacobian evaluations: {self.stats['njev']}")
+			self.result_box.append(f"LU factorizations: {self.stats['nlu']}")
+		self.result_box.append(f"y({x[-1]:.6g}) = {y[-1]:.10g}")
+		if self.stats["events"]:
+			self.result_box.append("\nEvents:")
+			for name, x_e, y_e in self.stats["events"]:
+				self.result_box.append(f"{name} at x = {x_e:.10g}, y = {y_e:.10g}")
+		if self.stats["message"]:
+			self.result_box.append(f"\n{self.stats['message']}")
+		if self.records:
+			self.result_box.append(f"\nMetrics:\n{metrics.FormatRecords(self.records)}")
+
+	def RunStudy(self):
+		#Euler and RK4 on h, h/2, ..., h/128 against the exact solution, in parallel worker processes
+		try:
+			x0 = float(self.x0_edit.text())
+			y0 = float(self.y_x0_edit.text())
+			b = float(self.b_edit.text())
+			h = float(self.h_edit.text())
+		except ValueError:
+			QMessageBox.warning(self, "Error", "'x0', 'y(x0)', 'b' and 'h' must be numbers", QMessageBox.StandardButton.Ok)
+			return
+		if h <= 0 or x0 >= b:
+			QMessageBox.warning(self, "Error", "'h' must be positive and 'x0' lower than 'b'", QMessageBox.StandardButton.Ok)
+			return
+		if not self.IsDefaultProblem():
+			QMessageBox.warning(self, "Error", "The study needs the exact solution, which is only known for y' = (y*y-y)/x", QMessageBox.StandardButton.Ok)
+			return
+		self.result_box.setPlainText("Running the study...")
+		self.runner.Submit(self.StudyJob, h, x0, y0, b)
+
+	def StudyJob(self, h, x0, y0, b, progress):
+		#Runs on a worker thread, which waits for the worker processes of the study
+		return "study", study.ConvergenceStudy((1, 2), h, 0.5, 8, x0, y0, b)
+
+	def ShowStudy(self, result):
+		results, orders = result
+		self.plot.Close()
+		self.fig.clear()
+		study.PlotStudy(results, orders, self.fig)
 		self.canvas.draw()
 
+		self.result_box.clear()
+		for method, order in orders.items():
+			self.result_box.append(f"{METHOD_NAMES[method]}: empirical order {order:.2f}")
+			for r in results:
+				if r["method"] == method:
+					self.result_box.append(f"h = {r['h']:.2e}: RHS evals {r['nfev']}, {r['time']:.2e} s, error {r['error']:.2e}")
+			self.result_box.append("")
+
 	def Solve(self):
 		x0 = float(self.x0_edit.text())
 		y0 = float(self.y_x0_edit.text())
-		a = float(self.a_edit.text())
 		b = float(self.b_edit.text())
 		h = float(self.h_edit.text())
+		atol = float(self.atol_edit.text())
+		rtol = float(self.rtol_edit.text())
+		stream = self.stream_edit.text() if self.stream_check.isChecked() else None
+
+		dfdy = self.dfdy if self.jacobian_box.currentText() == "Analytic" else None
+		events = self.events + self.FormEvents()
+		#Events registered by AddEvent have no text to key the cache by, runs with them are not cached
+		#A streamed run waits for the cancelled ones, which may still be writing the same file
+		self.runner.Submit(self.SolveJob, self.f, dfdy, self.method, x0, y0, b, h, atol, rtol, events, stream,
+			not self.events, self.metrics_check.isChecked(), exclusive=stream is not None)
+
+	def SolveJob(self, f, dfdy, method, x0, y0, b, h, atol, rtol, events, stream, cacheable, measure, progress):
+		#Runs on a worker thread, so it only uses its arguments. Measured and streamed runs skip the cache.
+		cached = cacheable and not measure and stream is None
+		params = {"f": f, "jacobian": dfdy is not None, "method": method, "x0": x0, "y0": y0, "b": b, "h": h,
+			"atol": atol, "rtol": rtol, "events": [(event["name"], event["terminal"], event.get("level")) for event in events]}
+		with metrics.Collect(measure) as records:
+			stats, x, y, y_dense = cache.Cached("ode", params,
+				lambda: self.Integrate(f, dfdy, method, x0, y0, b, h, atol, rtol, events, stream, progress), enabled=cached)
+		return "solution", (stats, x, y, y_dense, records)
+
+	def Integrate(self, f, dfdy, method, x0, y0, b, h, atol, rtol, events, stream, progress):
+		#Solution, its stats and for Dormand–Prince the dense output on 400 points
+		solver = ODESolver(f, dfdy, progress)
+		x, y = solver.Solve(method, x0, y0, b, h, atol, rtol, events, stream)
+		y_dense = solver.DenseOutput(np.linspace(x[0], x[-1], 400)) if method == 3 else None
+		return solver.stats, x, y, y_dense
+
+	def JobFailed(self, error):
+		if isinstance(error, OSError):
+			QMessageBox.warning(self, "Error", f"Cannot write the output file: {error}", QMessageBox.StandardButton.Ok)
+		else:
+			QMessageBox.warning(self, "Error", f"The solution failed: {error}", QMessageBox.StandardButton.Ok)
+		self.result_box.clear()
 
-		x_vals = [x0]
-		y_vals = [y0]
-
-		x = x0
-		y = y0
-
-		while x < b:
-			if self.method == 1:
-				y = y + h * self.f(x, y)
-				x = x + h
-				x_vals.append(x)
-				y_vals.append(y)
-
-			else:
-				k1 = self.f(x, y)
-				k2 = self.f(x + h/2, y + h*k1/2)
-				k3 = self.f(x + h/2, y + h*k2/2)
-				k4 = self.f(x + h, y + h*k3)
-
-				y = y + (h / 6) * (k1 + 2*k2 + 2*k3 + k4)
-				x = x + h
-
-				x_vals.append(x)
-				y_vals.append(y)
+	def closeEvent(self, event):
+		self.runner.Cancel()
+		self.runner.Wait() #A job must not outlive its window, it stops at its next progress call
+		super().closeEvent(event)
 
-		return np.array(x_vals), np.array(y_vals)
+	def FunctionChange(self):
+		#Compiles the entered y' into self.f and its symbolic df/dy into self.dfdy, both are cached by their text
+		try:
+			self.f = Compile(self.func_edit.text(), ("x", "y"))
+			self.dfdy = Differentiate(self.func_edit.text(), "y", ("x", "y"))
+		except ValueError as e:
+			QMessageBox.warning(self, "Error", f"Invalid function: {e}", QMessageBox.StandardButton.Ok)
+			return False
+		return True
+
+	def IsDefaultProblem(self):
+		return SameExpression(self.func_edit.text(), "(y*y-y)/x", ("x", "y"))
+
+	def FormEvents(self):
+		#Events set in the window
+		events = []
+		if self.stop_edit.text().strip():
+			y_stop = float(self.stop_edit.text())
+			events.append({"g": lambda x, y: abs(y) - y_stop, "terminal": True, "name": f"|y| >= {y_stop:g}", "level": y_stop})
+		if self.level_edit.text().strip():
+			level = float(self.level_edit.text())
+			events.append({"g": lambda x, y: y - level, "terminal": False, "name": f"y = {level:g}", "level": level})
+		return events
+
+	def AddEvent(self, g, terminal=False, name=None):
+		#Registers g(x, y) for every following run, see ODESolver.AddEvent
+		self.events.append({"g": g, "terminal": terminal, "name": name or f"event {len(self.events) + 1}"})
+
+	def ClearEvents(self):
+		self.events = []
 
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	window = MainWindow()
+	window.show()
 	sys.exit(app.exec())
 
@@ -0,0 +1,128 @@
+import time
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+#Runs the solvers of the labs on a worker thread, so the windows stay responsive.
+#The work function is called with progress=callback, the kernels call it with partial results,
+#which arrive in the GUI thread through the progress signal of the runner.
+#A job cancelled by Cancel() or by a newer Submit() stops at its next progress call,
+#and nothing a cancelled job sends is delivered.
+
+class Cancelled(Exception):
+	pass
+
+class JobSignals(QObject):
+	#Emitted on the worker thread, delivered to the runner on the GUI thread
+	progress = pyqtSignal(int, str, object)
+	finished = pyqtSignal(int, object)
+	failed = pyqtSignal(int, object)
+
+class JobState:
+	#What the runner keeps of a job. The pool owns the Job and deletes it once run() returns,
+	#so the runner never touches the Job itself, only this.
+
+	def __init__(self, number, after=()):
+		self.number = number
+		self.after = list(after) #Jobs that must return before this one starts
+		self.cancelled = False
+		self.returned = threading.Event()
+
+class Job(QRunnable):
+
+	def __init__(self, state, func, args, signals):
+		super().__init__()
+		self.setAutoDelete(True) #Hands the job over to the pool, which keeps it alive while it runs
+		self.state = state
+		self.func = func
+		self.args = args
+		self.signals = signals
+
+	def run(self):
+		try:
+			self.Run()
+		finally: #After the result is sent, so Wait() returns with it queued
+			self.state.returned.set()
+
+	def Run(self):
+		for state in self.state.after:
+			state.returned.wait()
+		self.state.after = []
+		if self.state.cancelled:
+			return
+		try:
+			result = self.func(*self.args, progress=self.Progress)
+		except Cancelled:
+			return
+		except Exception as e: #Shown by the window, a failed job must not take the worker thread down
+			self.signals.failed.emit(self.state.number, e)
+			return
+		self.signals.finished.emit(self.state.number, result)
+
+	def Progress(self, kind, value):
+		if self.state.cancelled:
+			raise Cancelled()
+		self.signals.progress.emit(self.state.number, kind, value)
+
+class JobRunner(QObject):
+	#One job at a time: submitting a new one cancels the one in flight.
+	#cancelled is emitted when Cancel() stops a running job.
+	progress = pyqtSignal(str, object)
+	finished = pyqtSignal(object)
+	failed = pyqtSignal(object)
+	cancelled = pyqtSignal()
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+		self.pool = QThreadPool.globalInstance()
+		self.signals = JobSignals(self)
+		self.signals.progress.connect(self.JobProgress)
+		self.signals.finished.connect(self.JobFinished)
+		self.signals.failed.connect(self.JobFailed)
+		self.job = None #State of the current job
+		self.states = [] #States of the jobs that have not returned yet, cancelled ones included
+		self.number = 0
+
+	def Submit(self, func, *args, exclusive=False):
+		#An exclusive job starts only when the jobs it replaces have returned, for jobs that write the same file
+		if self.job is not None: #Replaced by the new job, so cancelled is not emitted
+			self.job.cancelled = True
+		self.states = [state for state in self.states if not state.returned.is_set()]
+		self.number += 1
+		self.job = JobState(self.number, self.states if exclusive else ())
+		self.states.append(self.job)
+		self.pool.start(Job(self.job, func, args, self.signals))
+
+	def Cancel(self):
+		if self.job is not None:
+			self.job.cancelled = True
+			self.job = None
+			self.cancelled.emit()
+
+	def IsRunning(self):
+		return self.job is not None
+
+	def Wait(self, msecs=-1):
+		#Blocks until the jobs of this runner have returned, the results are still delivered by the event loop
+		deadline = None if msecs < 0 else time.monotonic() + msecs / 1000
+		for state in self.states:
+			timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+			if not state.returned.wait(timeout):
+				return False
+		return True
+
+	def IsCurrent(self, number):
+		return self.job is not None and number == self.job.number
+
+	def JobProgress(self, number, kind, value):
+		if self.IsCurrent(number):
+			self.progress.emit(kind, value)
+
+	def JobFinished(self, number, result):
+		if self.IsCurrent(number):
+			self.job = None
+			self.finished.emit(result)
+
+	def JobFailed(self, number, error):
+		if self.IsCurrent(number):
+			self.job = None
+			self.failed.emit(error)
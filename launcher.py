@@ -0,0 +1,81 @@
+import sys
+import importlib
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import QApplication, QTabWidget, QWidget, QLabel, QVBoxLayout
+
+#All labs in one window, one tab each. Run as: python launcher.py [lab], e.g. python launcher.py 6
+#A lab module, and with it NumPy and matplotlib, is only imported when its tab is opened for the first time,
+#so the window shows before anything heavy is loaded and the labs that are not opened cost nothing.
+
+LABS = [
+	("Lab1", "Nonlinear equations"),
+	("Lab2", "Integrals"),
+	("Lab3", "Linear regression"),
+	("Lab4", "Interpolation"),
+	("Lab6", "Differential equations"),
+]
+
+class Launcher(QTabWidget):
+
+	def __init__(self, first=0):
+		super().__init__()
+		self.windows = {}
+		self.setWindowTitle("Numerical methods")
+		for module, title in LABS:
+			page = QWidget()
+			page.setFixedSize(900, 600) #Size of the biggest lab, so the window keeps its size when a lab is loaded
+			label = QLabel(f"Loading {title}...")
+			label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+			layout = QVBoxLayout(page)
+			layout.setContentsMargins(0, 0, 0, 0)
+			layout.addWidget(label)
+			self.addTab(page, title)
+		self.setFixedSize(self.minimumSizeHint()) #Fixed like the windows of the labs
+		self.setCurrentIndex(first)
+		self.currentChanged.connect(self.Open)
+
+	def Open(self, index):
+		#Builds the lab of the tab the first time it is shown
+		module, title = LABS[index]
+		if module in self.windows:
+			self.setWindowTitle(self.windows[module].windowTitle())
+			return
+		layout = self.widget(index).layout()
+		label = layout.itemAt(0).widget()
+		QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+		try:
+			window = importlib.import_module(module).MainWindow()
+		except ImportError as e: #A missing dependency only takes its lab down
+			label.setText(f"Cannot open {title}: {e}")
+			return
+		finally:
+			QApplication.restoreOverrideCursor()
+		self.windows[module] = window
+		layout.removeWidget(label)
+		label.deleteLater()
+		layout.addWidget(window, alignment=Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+		self.setWindowTitle(window.windowTitle())
+
+	def closeEvent(self, event):
+		for window in self.windows.values(): #Cancels their jobs
+			window.close()
+		super().closeEvent(event)
+
+def LabIndex(name):
+	#"6", "Lab6" or "lab6"
+	name = name if name.lower().startswith("lab") else f"Lab{name}"
+	for index, (module, title) in enumerate(LABS):
+		if module.lower() == name.lower():
+			return index
+	raise ValueError(f"unknown lab '{name}', expected one of {', '.join(module for module, title in LABS)}")
+
+if __name__ == '__main__':
+	try:
+		first = LabIndex(sys.argv[1]) if len(sys.argv) > 1 else 0
+	except ValueError as e:
+		sys.exit(str(e))
+	app = QApplication(sys.argv)
+	launcher = Launcher(first)
+	launcher.show()
+	QTimer.singleShot(0, lambda: launcher.Open(launcher.currentIndex())) #Loaded once the window is on screen
+	sys.exit(app.exec())
@@ -0,0 +1,8 @@
+#Numerical methods of the labs without the Qt windows, only NumPy is needed
+from nummeth.roots import RootFinder
+from nummeth.integrals import Integrator, INTEGRALS
+from nummeth.regression import least_squares
+from nummeth.interpolation import LagrangePolynomial, EquidistantNodes
+from nummeth.ode import ODESolver, METHOD_NAMES
+
+__version__ = "0.1"
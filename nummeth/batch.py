@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from nummeth import ode, roots, integrals, interpolation, metrics, cache
+from nummeth.regression import least_squares
+from nummeth.expr import Compile, Differentiate
+
+#Batch runner: one JSON job per line, results as JSON lines in the same order.
+#Run as: python -m nummeth.batch jobs.jsonl -o results.jsonl --workers 8 --npy-dir arrays
+#
+#Job kinds and their fields (defaults are the ones of the labs):
+#  roots       function, a, b, precision
+#  integral    function, a, b, division, method (Rectangle, Trapezoid, Monte-Carlo or all), seed
+#  regression  x, y
+#  lagrange    function, a, b, nodes, xmin, xmax, points
+#  ode         method, x0, y0, b, h, atol, rtol
+#Any job with "metrics": true, or every job with --metrics, gets the metrics records of its kernels.
+#With --cache the results are kept in the result cache (see nummeth.cache) and repeated jobs are not run again,
+#jobs with metrics always run, and so do integral jobs with a Monte-Carlo estimate but without a seed.
+
+#Functions are expression texts such as "x*tanh(x)-1", ode jobs also use y
+
+def GetFunction(job, default, variables=("x",)):
+	#Compiled once per worker process and reused by its later jobs
+	return Compile(job.get("function", default), variables)
+
+def RunRoots(job):
+	finder = roots.RootFinder(GetFunction(job, "x*tanh(x)-1"), job.get("precision", 1e-4))
+	return finder.FindRoot(job.get("a", -2.0), job.get("b", 2.0))
+
+def RunIntegral(job):
+	text, (a, b) = integrals.INTEGRALS[0]
+	integrator = integrals.Integrator(GetFunction(job, text), job.get("a", a), job.get("b", b), job.get("division", 10))
+	method = job.get("method", "all")
+	rng = np.random.default_rng(job.get("seed"))
+	methods = {
+		"Rectangle": integrator.RectangleMethod,
+		"Trapezoid": integrator.TrapezoidMethod,
+		"Monte-Carlo": lambda: integrator.MonteCarlo(rng),
+	}
+	if method == "all":
+		return {name: float(run()) for name, run in methods.items()}
+	if method not in methods:
+		raise ValueError(f"unknown integration method '{method}'")
+	return {method: float(methods[method]())}
+
+def RunRegression(job):
+	k, b = least_squares(job["x"], job["y"])
+	return {"k": k, "b": b}
+
+def RunLagrange(job):
+	f = GetFunction(job, "sin(x)")
+	x_nodes = interpolation.EquidistantNodes(job.get("a", -15.0), job.get("b", 5.0), job.get("nodes", 11))
+	y_nodes = f(x_nodes)
+	x = np.linspace(job.get("xmin", -15.0), job.get("xmax", 5.0), job.get("points", 400))
+	return {"x_nodes": x_nodes, "y_nodes": y_nodes, "x": x, "y": interpolation.LagrangePolynomial(x, x_nodes, y_nodes)}
+
+def RunODE(job):
+	text = job.get("function", "(y*y-y)/x")
+	solver = ode.ODESolver(GetFunction(job, text, VARIABLES["ode"]), Differentiate(text, "y", VARIABLES["ode"]))
+	x, y = solver.Solve(job.get("method", 1), job.get("x0", 1.0), job.get("y0", 0.5), job.get("b", 4.0),
+		job.get("h", 0.1), job.get("atol", 1e-6), job.get("rtol", 1e-6))
+	stats = dict(solver.stats)
+	stats["events"] = []
+	return {"x": x, "y": y, "stats": stats}
+
+KINDS = {
+	"roots": RunRoots,
+	"integral": RunIntegral,
+	"regression": RunRegression,
+	"lagrange": RunLagrange,
+	"ode": RunODE,
+}
+
+VARIABLES = {"ode": ("x", "y")} #Variables of the functions of a job kind, x when not listed
+
+def IsRandom(job):
+	#Results that differ from run to run, which must not be cached
+	return job.get("kind") == "integral" and job.get("method", "all") in ("all", "Monte-Carlo") and job.get("seed") is None
+
+def RunJob(job):
+	#Runs in a worker process. Errors are reported in the record instead of stopping the batch.
+	record = {"id": job.get("id"), "kind": job.get("kind")}
+	start = time.perf_counter()
+	try:
+		if record["kind"] not in KINDS:
+			raise ValueError(f"unknown job kind '{record['kind']}'")
+		measure = job.get("metrics", False)
+		store = cache.Open(job["cache"]) if job.get("cache") and not measure and not IsRandom(job) else None
+		params = {key: value for key, value in job.items() if key not in ("id", "metrics", "cache")}
+		if store is not None and "function" in params: #Keyed by the parsed expression, as in the labs
+			params["function"] = Compile(params["function"], VARIABLES.get(record["kind"], ("x",)))
+		with metrics.Collect(measure) as records:
+			record["result"] = cache.Cached(f"batch/{record['kind']}", params, lambda: KINDS[record["kind"]](job),
+				enabled=store is not None, cache=store)
+		if records:
+			record["metrics"] = records
+	except Exception as e: #Any failure of a kernel, as in jobs.Job.run
+		record["error"] = f"{type(e).__name__}: {e}"
+	record["time"] = time.perf_counter() - start
+	return record
+
+def ReadJobs(path):
+	jobs = []
+	with open(path) as file:
+		for number, line in enumerate(file, 1):
+			if line.strip():
+				job = json.loads(line)
+				job.setdefault("id", number)
+				jobs.append(job)
+	return jobs
+
+def ToJSON(record, npy_dir=None):
+	#Arrays become lists, or .npy files next to the results when npy_dir is given
+	def convert(value, name):
+		if isinstance(value, np.ndarray):
+			if npy_dir is None:
+				return value.tolist()
+			path = os.path.join(npy_dir, f"{record['id']}_{name}.npy")
+			np.save(path, value)
+			return {"npy": path}
+		if isinstance(value, dict):
+			return {key: convert(item, key if name in ("", "result") else f"{name}_{key}") for key, item in value.items()}
+		if isinstance(value, (list, tuple)):
+			return [convert(item, name) for item in value]
+		if isinstance(value, np.generic):
+			return value.item()
+		return value
+	return json.dumps(convert(record, ""), ensure_ascii=False)
+
+def RunBatch(jobs, out, workers=None, npy_dir=None, chunksize=1):
+	if npy_dir is not None:
+		os.makedirs(npy_dir, exist_ok=True)
+	failed = 0
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		for record in pool.map(RunJob, jobs, chunksize=chunksize):
+			failed += "error" in record
+			out.write(ToJSON(record, npy_dir) + "\n")
+	return failed
+
+def main():
+	parser = argparse.ArgumentParser(description="Run many numerical methods jobs in parallel")
+	parser.add_argument("jobs", help="File with one JSON job per line")
+	parser.add_argument("-o", "--output", help="Results file, standard output by default")
+	parser.add_argument("--workers", type=int, default=None, help="Number of worker processes, all cores by default")
+	parser.add_argument("--npy-dir", help="Store result arrays as .npy files in this directory")
+	parser.add_argument("--chunksize", type=int, default=1, help="Jobs sent to a worker at once")
+	parser.add_argument("--metrics", action="store_true", help="Add evaluation counts and times of the kernels to every result")
+	parser.add_argument("--cache", nargs="?", const=cache.DefaultPath(), help="Reuse the results stored in this cache folder, "
+		"$NUMMETH_CACHE or ~/.cache/nummeth without a folder")
+	args = parser.parse_args()
+
+	jobs = ReadJobs(args.jobs)
+	if args.metrics:
+		for job in jobs:
+			job.setdefault("metrics", True)
+	if args.cache:
+		for job in jobs:
+			job["cache"] = args.cache
+	if args.output:
+		with open(args.output, "w") as out:
+			failed = RunBatch(jobs, out, args.workers, args.npy_dir, args.chunksize)
+	else:
+		failed = RunBatch(jobs, sys.stdout, args.workers, args.npy_dir, args.chunksize)
+	if failed:
+		print(f"{failed} of {len(jobs)} jobs failed", file=sys.stderr)
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
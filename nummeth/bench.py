@@ -0,0 +1,172 @@
+import sys
+import json
+import time
+import timeit
+import fnmatch
+import platform
+import argparse
+import numpy as np
+from nummeth import ode, roots, integrals, interpolation
+from nummeth.regression import least_squares
+from nummeth.expr import Compile
+
+#Benchmarks of the lab kernels over growing problem sizes.
+#Run as: python -m nummeth.bench -o bench.json --baseline old.json --threshold 10
+#Every case is timed in this process, one after another, so the timings do not compete for cores.
+#With a baseline the cases slower by more than threshold percent are listed and the exit code is 1.
+
+SIZES = {
+	"roots": (2, 8, 32), #Roots in the range
+	"divisions": (10, 1000, 100000),
+	"points": (100, 10000, 100000),
+	"nodes": (11, 21, 41),
+	"steps": (100, 1000, 10000),
+}
+
+def RootsCases(sizes):
+	#sin(x) on [0.5, 0.5 + n*pi] has exactly n roots
+	f = Compile("sin(x)")
+	cases = []
+	for n in sizes:
+		a, b = 0.5, 0.5 + n*np.pi
+		finder = roots.RootFinder(f, 1e-4)
+		intervals = finder.ShorteningRootIntervals(a, b)
+		cases += [
+			(f"roots/intervals[roots={n}]", lambda finder=finder, a=a, b=b: finder.ShorteningRootIntervals(a, b)),
+			(f"roots/iteration[roots={n}]", lambda finder=finder, intervals=intervals: finder.IterationMethod(intervals)),
+			(f"roots/dichotomy[roots={n}]", lambda finder=finder, intervals=intervals: finder.DichotomyMethod(intervals)),
+			(f"roots/newton[roots={n}]", lambda finder=finder, intervals=intervals: finder.NewtonsMethod(intervals)),
+		]
+	return cases
+
+def IntegralCases(sizes):
+	text, (a, b) = integrals.INTEGRALS[0]
+	f = Compile(text)
+	cases = []
+	for n in sizes:
+		integrator = integrals.Integrator(f, a, b, n)
+		cases += [
+			(f"integral/rectangle[divisions={n}]", integrator.RectangleMethod),
+			(f"integral/trapezoid[divisions={n}]", integrator.TrapezoidMethod),
+			#Same dots on every run, so the runs do the same work
+			(f"integral/monte-carlo[divisions={n}]", lambda integrator=integrator: integrator.MonteCarlo(np.random.default_rng(0))),
+		]
+	return cases
+
+def RegressionCases(sizes):
+	cases = []
+	for n in sizes:
+		rng = np.random.default_rng(0)
+		x = np.linspace(0, 100, n)
+		y = 3*x + 2 + rng.normal(0, 1, n)
+		cases.append((f"regression/least_squares[points={n}]", lambda x=x, y=y: least_squares(x, y)))
+	return cases
+
+def LagrangeCases(sizes, points=(400, 10000)):
+	cases = []
+	for n in sizes:
+		x_nodes = interpolation.EquidistantNodes(-15, 5, n)
+		y_nodes = interpolation.f(x_nodes)
+		for m in points:
+			x = np.linspace(-15, 5, m)
+			cases.append((f"lagrange/polynomial[nodes={n},points={m}]",
+				lambda x=x, x_nodes=x_nodes, y_nodes=y_nodes: interpolation.LagrangePolynomial(x, x_nodes, y_nodes)))
+	return cases
+
+ODE_NAMES = {1: "euler", 2: "rk4", 3: "dopri", 4: "backward-euler", 5: "crank-nicolson", 6: "bdf"}
+
+def ODECases(sizes, methods=(1, 2), x0=1.0, y0=0.5, b=4.0):
+	cases = []
+	for method in methods:
+		for n in sizes:
+			solver = ode.ODESolver(ode.f)
+			h = (b - x0) / n
+			cases.append((f"ode/{ODE_NAMES[method]}[steps={n}]", lambda solver=solver, method=method, h=h: solver.Solve(method, x0, y0, b, h)))
+	return cases
+
+def Cases(quick=False):
+	#quick keeps only the smallest size of every kernel, for a fast sanity run
+	sizes = {key: values[:1] if quick else values for key, values in SIZES.items()}
+	return (RootsCases(sizes["roots"]) + IntegralCases(sizes["divisions"]) + RegressionCases(sizes["points"])
+		+ LagrangeCases(sizes["nodes"]) + ODECases(sizes["steps"]))
+
+def Matches(name, pattern):
+	#pattern is a kernel ("ode"), a whole case name or a glob over the names ("ode/rk4*"), empty matches everything
+	return not pattern or name.split("/")[0] == pattern or name == pattern or fnmatch.fnmatchcase(name, pattern)
+
+def TimeCase(func, repeat=5, min_time=0.05):
+	#Calls are batched until a batch takes min_time, the best batch of repeat gives the time of one call
+	timer = timeit.Timer(func)
+	number = 1
+	for i in range(30):
+		number = (1, 2, 5)[i % 3] * 10 ** (i // 3)
+		if timer.timeit(number) >= min_time:
+			break
+	return min(timer.repeat(repeat, number)) / number, number
+
+def RunBenchmarks(cases, repeat=5, min_time=0.05, log=None):
+	results = {}
+	for name, func in cases:
+		elapsed, number = TimeCase(func, repeat, min_time)
+		results[name] = {"time": elapsed, "number": number}
+		if log is not None:
+			print(f"{name:<48}{elapsed:>12.3e} s", file=log, flush=True)
+	return results
+
+def Environment():
+	return {
+		"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"machine": platform.machine(),
+		"processor": platform.processor(),
+		"system": platform.system(),
+	}
+
+def Compare(results, baseline, threshold=10.0):
+	#Change of every case present in both runs, in percent of the baseline time
+	rows = []
+	for name, result in results.items():
+		if name in baseline:
+			change = (result["time"] / baseline[name]["time"] - 1) * 100
+			rows.append({"name": name, "baseline": baseline[name]["time"], "time": result["time"],
+				"change": change, "slower": change > threshold})
+	return rows
+
+def FormatComparison(rows, threshold):
+	lines = [f"{'case':<48}{'baseline, s':>13}{'time, s':>12}{'change':>10}"]
+	for row in rows:
+		mark = "  SLOWER" if row["slower"] else ""
+		lines.append(f"{row['name']:<48}{row['baseline']:>13.3e}{row['time']:>12.3e}{row['change']:>+9.1f}%{mark}")
+	slower = sum(row["slower"] for row in rows)
+	lines.append("")
+	lines.append(f"{slower} of {len(rows)} cases slower than the baseline by more than {threshold:g}%")
+	return "\n".join(lines)
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmarks of the numerical methods of the labs")
+	parser.add_argument("-o", "--output", help="Save the results to this JSON file")
+	parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+	parser.add_argument("--threshold", type=float, default=10.0, help="Slowdown in percent that is reported")
+	parser.add_argument("--filter", default="", help="Only run the cases of this kernel (e.g. ode), or whose name matches this glob (e.g. 'ode/rk4*')")
+	parser.add_argument("--quick", action="store_true", help="Only the smallest problem sizes")
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--min-time", type=float, default=0.05, help="Shortest timed batch of calls, s")
+	args = parser.parse_args()
+
+	cases = [(name, func) for name, func in Cases(args.quick) if Matches(name, args.filter)]
+	results = RunBenchmarks(cases, args.repeat, args.min_time, sys.stdout)
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump({"environment": Environment(), "results": results}, file, indent=1)
+	if args.baseline:
+		with open(args.baseline) as file:
+			baseline = json.load(file)["results"]
+		rows = Compare(results, baseline, args.threshold)
+		print()
+		print(FormatComparison(rows, args.threshold))
+		if any(row["slower"] for row in rows):
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main()
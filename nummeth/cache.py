@@ -0,0 +1,235 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import functools
+import threading
+import contextlib
+import numpy as np
+import nummeth
+from nummeth.expr import Expression
+
+#On-disk store of kernel results, shared by the labs and the batch runner across sessions and processes.
+#The key is a hash of the kind of problem, its parameters and the code version of the kernels:
+#functions are keyed by their parsed expression, so "x**2-2" and "x**2 - 2" share results,
+#and editing a kernel module makes the results it computed unreachable.
+#Small values are kept as JSON in the SQLite index, arrays of BLOB_MIN_SIZE elements or more as .npy files next to it.
+#When the store grows over max_bytes the least recently used entries are evicted, a result bigger than that is not stored.
+#The location is $NUMMETH_CACHE or ~/.cache/nummeth, NUMMETH_CACHE= (empty) turns caching off.
+#Run as: python -m nummeth.cache [--clear], which lists what is stored
+
+MAX_BYTES = 256 * 2**20
+BLOB_MIN_SIZE = 1024 #Arrays at least this long are stored as .npy files
+KERNEL_MODULES = ("expr", "roots", "integrals", "regression", "interpolation", "ode")
+
+@functools.lru_cache(maxsize=1)
+def CodeVersion():
+	#Package version and a hash of the kernel sources
+	digest = hashlib.sha256()
+	folder = os.path.dirname(os.path.abspath(__file__))
+	for name in KERNEL_MODULES:
+		with open(os.path.join(folder, f"{name}.py"), "rb") as file:
+			digest.update(file.read())
+	return f"{nummeth.__version__}-{digest.hexdigest()[:16]}"
+
+def KeyValue(value):
+	if isinstance(value, Expression):
+		return {"expression": ast.dump(value.tree), "variables": list(value.variables)}
+	if isinstance(value, np.ndarray):
+		return {"array": value.tolist(), "dtype": value.dtype.str}
+	if isinstance(value, np.generic):
+		return value.item()
+	raise TypeError(f"{type(value).__name__} cannot be part of a cache key")
+
+def Key(kind, params):
+	#Floats are written by repr, so any change of a parameter gives another key
+	text = json.dumps([kind, params, CodeVersion()], sort_keys=True, default=KeyValue)
+	return hashlib.sha256(text.encode()).hexdigest()
+
+def Encode(value, blobs):
+	#JSON-ready form of a result, the big arrays are appended to blobs
+	if isinstance(value, np.ndarray):
+		if value.size >= BLOB_MIN_SIZE:
+			blobs.append(value)
+			return {"npy": len(blobs) - 1}
+		return {"array": value.tolist(), "dtype": value.dtype.str, "shape": value.shape}
+	if isinstance(value, dict):
+		if not all(isinstance(key, str) for key in value):
+			raise TypeError("only dicts with str keys can be cached")
+		return {"dict": {key: Encode(item, blobs) for key, item in value.items()}}
+	if isinstance(value, tuple):
+		return {"tuple": [Encode(item, blobs) for item in value]}
+	if isinstance(value, list):
+		return [Encode(item, blobs) for item in value]
+	if isinstance(value, np.generic):
+		return value.item()
+	if value is None or isinstance(value, (bool, int, float, str)):
+		return value
+	raise TypeError(f"{type(value).__name__} cannot be cached")
+
+def Decode(value, blobs):
+	if isinstance(value, list):
+		return [Decode(item, blobs) for item in value]
+	if not isinstance(value, dict):
+		return value
+	if "npy" in value:
+		return blobs[value["npy"]]
+	if "array" in value:
+		return np.array(value["array"], dtype=value["dtype"]).reshape(value["shape"])
+	if "tuple" in value:
+		return tuple(Decode(item, blobs) for item in value["tuple"])
+	return {key: Decode(item, blobs) for key, item in value["dict"].items()}
+
+MISSING = object()
+
+class ResultCache:
+	#Every call opens its own connection, so one cache can be used from the worker threads of the labs
+
+	def __init__(self, path, max_bytes=MAX_BYTES):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.blob_dir = os.path.join(path, "blobs")
+		os.makedirs(self.blob_dir, exist_ok=True)
+		with self.Connect() as db:
+			db.execute("PRAGMA journal_mode=WAL") #Readers of other processes do not wait for a writer
+			db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, kind TEXT, value TEXT, "
+				"blobs INTEGER, size INTEGER, used REAL)")
+			db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+
+	@contextlib.contextmanager
+	def Connect(self):
+		db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), timeout=30)
+		try:
+			with db: #Commits, or rolls back on an error
+				yield db
+		finally:
+			db.close()
+
+	def BlobPath(self, key, number):
+		return os.path.join(self.blob_dir, f"{key}_{number}.npy")
+
+	def Get(self, key, default=None):
+		with self.Connect() as db:
+			row = db.execute("SELECT value, blobs FROM entries WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return default
+			try:
+				blobs = [np.load(self.BlobPath(key, i), allow_pickle=False) for i in range(row[1])]
+			except (OSError, ValueError): #Evicted by another process meanwhile, or a broken file
+				db.execute("DELETE FROM entries WHERE key = ?", (key,))
+				return default
+			db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+		return Decode(json.loads(row[0]), blobs)
+
+	def Put(self, key, kind, value):
+		blobs = []
+		text = json.dumps(Encode(value, blobs))
+		size = len(text)
+		if size + sum(blob.nbytes for blob in blobs) > self.max_bytes:
+			return #Would evict everything else and still not fit, so it is not stored
+		for i, blob in enumerate(blobs):
+			#Written under a temporary name and renamed, so no process ever reads half a file
+			temp = f"{self.BlobPath(key, i)}.{os.getpid()}.{threading.get_ident()}.tmp"
+			np.save(temp, blob, allow_pickle=False)
+			os.replace(temp + ".npy", self.BlobPath(key, i))
+			size += os.path.getsize(self.BlobPath(key, i))
+		with self.Connect() as db:
+			db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", (key, kind, text, len(blobs), size, time.time()))
+		self.Evict()
+
+	def Evict(self):
+		#Drops the least recently used entries until the store fits into max_bytes
+		with self.Connect() as db:
+			total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+			if total <= self.max_bytes:
+				return
+			evicted = []
+			for key, blobs, size in db.execute("SELECT key, blobs, size FROM entries ORDER BY used").fetchall():
+				if total <= self.max_bytes:
+					break
+				evicted.append((key, blobs))
+				total -= size
+			db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, blobs in evicted])
+		for key, blobs in evicted:
+			for i in range(blobs):
+				with contextlib.suppress(FileNotFoundError):
+					os.remove(self.BlobPath(key, i))
+
+	def Cached(self, kind, params, compute):
+		#Stored result of the problem, or the result of compute() which is then stored.
+		#A cache that cannot be read or written only costs the computation.
+		try:
+			key = Key(kind, params)
+			value = self.Get(key, MISSING)
+		except (sqlite3.Error, OSError, ValueError, TypeError):
+			return compute()
+		if value is not MISSING:
+			return value
+		value = compute()
+		with contextlib.suppress(sqlite3.Error, OSError, ValueError, TypeError):
+			self.Put(key, kind, value)
+		return value
+
+	def Info(self):
+		with self.Connect() as db:
+			rows = db.execute("SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY kind ORDER BY kind").fetchall()
+		return {kind: {"entries": count, "bytes": size} for kind, count, size in rows}
+
+	def Clear(self):
+		with self.Connect() as db:
+			rows = db.execute("SELECT key, blobs FROM entries").fetchall()
+			db.execute("DELETE FROM entries")
+		for key, blobs in rows:
+			for i in range(blobs):
+				with contextlib.suppress(FileNotFoundError):
+					os.remove(self.BlobPath(key, i))
+
+def DefaultPath():
+	return os.environ.get("NUMMETH_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "nummeth"))
+
+@functools.lru_cache(maxsize=None)
+def Open(path):
+	#One cache per folder and process
+	return ResultCache(path)
+
+def Default():
+	#Cache at DefaultPath(), None when caching is off or the folder cannot be used
+	path = DefaultPath()
+	if not path:
+		return None
+	try:
+		return Open(path)
+	except (sqlite3.Error, OSError):
+		return None
+
+def Cached(kind, params, compute, enabled=True, cache=None):
+	#Cached() of the given cache or of the default one, compute() alone when disabled
+	cache = Default() if cache is None and enabled else cache
+	if not enabled or cache is None:
+		return compute()
+	return cache.Cached(kind, params, compute)
+
+def main():
+	parser = argparse.ArgumentParser(description="Result cache of the numerical methods")
+	parser.add_argument("--path", default=DefaultPath(), help="Cache folder, $NUMMETH_CACHE or ~/.cache/nummeth by default")
+	parser.add_argument("--clear", action="store_true", help="Remove every stored result")
+	args = parser.parse_args()
+	if not args.path:
+		print("Caching is off", file=sys.stderr)
+		sys.exit(1)
+
+	cache = ResultCache(args.path)
+	if args.clear:
+		cache.Clear()
+	info = cache.Info()
+	print(f"{args.path}, code version {CodeVersion()}")
+	for kind, entry in info.items():
+		print(f"{kind:<16}{entry['entries']:>8} entries{entry['bytes'] / 2**20:>10.2f} MB")
+	print(f"{'total':<16}{sum(e['entries'] for e in info.values()):>8} entries{sum(e['bytes'] for e in info.values()) / 2**20:>10.2f} MB")
+
+if __name__ == "__main__":
+	main()
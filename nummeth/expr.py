@@ -0,0 +1,257 @@
+import ast
+import functools
+import numpy as np
+
+try:
+	import numexpr
+except ImportError: #Without numexpr every call goes through NumPy
+	numexpr = None
+
+#Compiler of user-entered functions such as "x*tanh(x)-1" or "(y*y-y)/x".
+#Only arithmetic, the functions below, pi and e are allowed, so nothing else can be evaluated.
+#Big arrays are evaluated by numexpr on all cores, scalars and small arrays by NumPy,
+#where starting the numexpr virtual machine would cost more than the evaluation itself.
+
+FUNCTIONS = {
+	"sin": np.sin,
+	"cos": np.cos,
+	"tan": np.tan,
+	"arcsin": np.arcsin,
+	"arccos": np.arccos,
+	"arctan": np.arctan,
+	"sinh": np.sinh,
+	"cosh": np.cosh,
+	"tanh": np.tanh,
+	"exp": np.exp,
+	"log": np.log,
+	"log10": np.log10,
+	"sqrt": np.sqrt,
+	"abs": np.abs,
+}
+CONSTANTS = {"pi": np.pi, "e": np.e}
+NUMEXPR_MIN_SIZE = 4096 #Arrays at least this long go to numexpr
+NUMBERS = frozenset((float, int, np.float64)) #Argument types of the fast path on single numbers
+
+OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+
+class Expression:
+	#Compiled expression, called with one value or array per variable
+
+	def __init__(self, text, variables, tree):
+		self.text = text
+		self.variables = variables
+		self.tree = tree
+		source = ast.unparse(tree)
+		#The tree is validated, so the lambdas can only reach the functions given here.
+		#The constants of the NumPy one are NumPy floats, so 1/0 gives inf as in numexpr instead of raising.
+		#The one with plain constants is faster on Python floats, NumPy takes over where it raises.
+		namespace = {"__builtins__": {}, "float64": np.float64, **FUNCTIONS}
+		self.python = eval(f"lambda {', '.join(variables)}: {source}", namespace)
+		self.numpy = eval(f"lambda {', '.join(variables)}: {ast.unparse(NumPyConstants(tree))}", namespace)
+		self.numexpr = None
+		if numexpr is not None:
+			try:
+				self.numexpr = numexpr.NumExpr(source, [(name, np.float64) for name in variables])
+			except (ValueError, TypeError, KeyError, NotImplementedError, ArithmeticError): #Left to NumPy
+				self.numexpr = None
+
+	def __call__(self, *args):
+		#Numbers give a float, arrays an array of their broadcast shape, also for constant expressions.
+		#Every path gives inf and nan where Python would raise or return a complex number.
+		if NUMBERS.issuperset(map(type, args)):
+			try:
+				result = self.python(*args)
+			except ArithmeticError:
+				pass
+			else:
+				if type(result) is not complex:
+					return float(result)
+		args = [np.asarray(arg, dtype=np.float64) for arg in args]
+		shape = args[0].shape if len(args) == 1 else np.broadcast_shapes(*[arg.shape for arg in args])
+		if self.numexpr is not None and np.prod(shape) >= NUMEXPR_MIN_SIZE:
+			return self.numexpr(*args)
+		with np.errstate(all="ignore"):
+			result = self.numpy(*args)
+		if not shape:
+			return float(result)
+		return result if np.shape(result) == shape else np.full(shape, result)
+
+	def __repr__(self):
+		return f"Expression({self.text!r}, {self.variables!r})"
+
+def NumPyConstants(node):
+	#Copy of the tree with every constant c replaced by float64(c)
+	if isinstance(node, ast.Constant):
+		return ast.Call(ast.Name("float64", ast.Load()), [node], [])
+	if isinstance(node, ast.UnaryOp):
+		return ast.UnaryOp(node.op, NumPyConstants(node.operand))
+	if isinstance(node, ast.BinOp):
+		return ast.BinOp(NumPyConstants(node.left), node.op, NumPyConstants(node.right))
+	if isinstance(node, ast.Call):
+		return ast.Call(node.func, [NumPyConstants(arg) for arg in node.args], [])
+	return node
+
+def Parse(text, variables=("x",)):
+	#Parses and checks the expression, pi and e are replaced by their values
+	try:
+		tree = ast.parse(text.strip(), mode="eval").body
+	except SyntaxError:
+		raise ValueError(f"'{text}' is not a valid expression") from None
+	return Check(tree, variables)
+
+def Check(node, variables):
+	if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+		try:
+			return ast.Constant(float(node.value))
+		except OverflowError:
+			raise ValueError(f"a number of {len(str(node.value))} digits is too big") from None
+	if isinstance(node, ast.Name):
+		if node.id in variables:
+			return ast.Name(node.id, ast.Load())
+		if node.id in CONSTANTS:
+			return ast.Constant(CONSTANTS[node.id])
+		raise ValueError(f"unknown variable '{node.id}', expected {', '.join(variables)}")
+	if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+		return ast.UnaryOp(node.op, Check(node.operand, variables))
+	if isinstance(node, ast.BinOp):
+		if isinstance(node.op, ast.BitXor):
+			raise ValueError("use ** for powers")
+		if isinstance(node.op, OPERATORS):
+			return ast.BinOp(Check(node.left, variables), node.op, Check(node.right, variables))
+	if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+		if len(node.args) != 1 or node.keywords:
+			raise ValueError(f"{node.func.id}() takes exactly one argument")
+		return ast.Call(ast.Name(node.func.id, ast.Load()), [Check(node.args[0], variables)], [])
+	if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+		raise ValueError(f"unknown function '{node.func.id}'")
+	raise ValueError(f"'{ast.unparse(node)}' is not allowed in expressions")
+
+@functools.lru_cache(maxsize=128)
+def Compile(text, variables=("x",)):
+	#Compiled expressions are cached by their text, so re-entering a function costs nothing
+	return Expression(text, variables, Parse(text, variables))
+
+def CompileEquation(text, variables=("x",)):
+	#"lhs=rhs" becomes the function lhs-(rhs), whose roots solve the equation
+	if text.count("=") > 1:
+		raise ValueError(f"'{text}' has more than one '='")
+	if "=" in text:
+		lhs, rhs = text.split("=")
+		text = f"({lhs})-({rhs})" if rhs.strip() not in ("0", "0.0") else lhs
+	return Compile(text.strip(), variables)
+
+def SameExpression(text, other, variables=("x",)):
+	#True when both texts parse to the same tree, so spaces and redundant brackets do not matter
+	try:
+		return ast.dump(Parse(text, variables)) == ast.dump(Parse(other, variables))
+	except ValueError:
+		return False
+
+@functools.lru_cache(maxsize=128)
+def Differentiate(text, variable, variables=("x",)):
+	#Compiled symbolic derivative of the expression with respect to one of its variables
+	tree = Derivative(Parse(text, variables), variable)
+	return Expression(f"d({text})/d{variable}", variables, tree)
+
+def Derivative(node, var):
+	if isinstance(node, ast.Constant):
+		return Num(0)
+	if isinstance(node, ast.Name):
+		return Num(1 if node.id == var else 0)
+	if isinstance(node, ast.UnaryOp):
+		du = Derivative(node.operand, var)
+		return Neg(du) if isinstance(node.op, ast.USub) else du
+	if isinstance(node, ast.BinOp):
+		u = node.left
+		v = node.right
+		du = Derivative(u, var)
+		dv = Derivative(v, var)
+		if isinstance(node.op, ast.Add):
+			return Add(du, dv)
+		if isinstance(node.op, ast.Sub):
+			return Sub(du, dv)
+		if isinstance(node.op, ast.Mult):
+			return Add(Mul(du, v), Mul(u, dv))
+		if isinstance(node.op, ast.Div):
+			return Div(Sub(Mul(du, v), Mul(u, dv)), Pow(v, Num(2)))
+		if IsNum(dv, 0): #u**n
+			return Mul(Mul(v, Pow(u, Sub(v, Num(1)))), du)
+		if IsNum(du, 0): #a**v
+			return Mul(Mul(node, Call("log", u)), dv)
+		return Mul(node, Add(Mul(dv, Call("log", u)), Div(Mul(v, du), u)))
+	u = node.args[0]
+	du = Derivative(u, var)
+	name = node.func.id
+	rules = {
+		"sin": lambda: Call("cos", u),
+		"cos": lambda: Neg(Call("sin", u)),
+		"tan": lambda: Div(Num(1), Pow(Call("cos", u), Num(2))),
+		"arcsin": lambda: Div(Num(1), Call("sqrt", Sub(Num(1), Pow(u, Num(2))))),
+		"arccos": lambda: Neg(Div(Num(1), Call("sqrt", Sub(Num(1), Pow(u, Num(2)))))),
+		"arctan": lambda: Div(Num(1), Add(Num(1), Pow(u, Num(2)))),
+		"sinh": lambda: Call("cosh", u),
+		"cosh": lambda: Call("sinh", u),
+		"tanh": lambda: Sub(Num(1), Pow(Call("tanh", u), Num(2))),
+		"exp": lambda: Call("exp", u),
+		"log": lambda: Div(Num(1), u),
+		"log10": lambda: Div(Num(1), Mul(u, Num(np.log(10)))),
+		"sqrt": lambda: Div(Num(1), Mul(Num(2), Call("sqrt", u))),
+		"abs": lambda: Div(u, Call("abs", u)),
+	}
+	return Mul(rules[name](), du)
+
+#Tree builders that drop the zeros and ones the rules above produce
+def Num(value):
+	return ast.Constant(float(value))
+
+def IsNum(node, value):
+	return isinstance(node, ast.Constant) and node.value == value
+
+def Call(name, arg):
+	return ast.Call(ast.Name(name, ast.Load()), [arg], [])
+
+def Neg(a):
+	if isinstance(a, ast.Constant):
+		return Num(-a.value)
+	return ast.UnaryOp(ast.USub(), a)
+
+def Add(a, b):
+	if isinstance(a, ast.Constant) and isinstance(b, ast.Constant):
+		return Num(a.value + b.value)
+	if IsNum(a, 0):
+		return b
+	if IsNum(b, 0):
+		return a
+	return ast.BinOp(a, ast.Add(), b)
+
+def Sub(a, b):
+	if isinstance(a, ast.Constant) and isinstance(b, ast.Constant):
+		return Num(a.value - b.value)
+	if IsNum(b, 0):
+		return a
+	if IsNum(a, 0):
+		return Neg(b)
+	return ast.BinOp(a, ast.Sub(), b)
+
+def Mul(a, b):
+	if isinstance(a, ast.Constant) and isinstance(b, ast.Constant):
+		return Num(a.value * b.value)
+	if IsNum(a, 0) or IsNum(b, 0):
+		return Num(0)
+	if IsNum(a, 1):
+		return b
+	if IsNum(b, 1):
+		return a
+	return ast.BinOp(a, ast.Mult(), b)
+
+def Div(a, b):
+	if IsNum(a, 0):
+		return Num(0)
+	if IsNum(b, 1):
+		return a
+	return ast.BinOp(a, ast.Div(), b)
+
+def Pow(a, b):
+	if IsNum(b, 1):
+		return a
+	return ast.BinOp(a, ast.Pow(), b)
@@ -0,0 +1,87 @@
+import numpy as np
+from nummeth.metrics import Measured
+
+#Integrands of Lab2 with their default borders
+INTEGRALS = [
+	("1/(sqrt(x**2+1))", (0.2, 1.2)),
+	("cos(x)/(x+1)", (0.6, 1.4)),
+	("1/(1.5*x**2+0.7)", (1.4, 2.6)),
+]
+
+class Integrator:
+	#Integral of f over [a, b] split into division parts, f must accept arrays.
+	#The methods keep what Lab2 draws: rectangle mids and heights, Monte-Carlo dots and hits.
+	#progress(method, (x, s)) gets the integral s over [a, x] as a method goes and may stop the run by raising.
+
+	PROGRESS_DIVISIONS = 4096 #Divisions between two progress reports
+
+	def __init__(self, f, a, b, division, progress=None):
+		self.f = f
+		self.a = a
+		self.b = b
+		self.division = division
+		self.progress = progress
+
+	def Report(self, method, x, s):
+		if self.progress is not None:
+			self.progress(method, (x, s))
+
+	@Measured
+	def FindIntegral(self):
+		return {
+			"Rectangle": self.RectangleMethod(),
+			"Trapezoid": self.TrapezoidMethod(),
+			"Monte-Carlo": self.MonteCarlo(),
+		}
+
+	@Measured
+	def RectangleMethod(self):
+		a = self.a
+		step = (self.b - self.a) / self.division
+		s = 0
+		self.mids = []
+		self.heights = []
+		for i in range(self.division):
+			rect = a + step / 2
+			s += self.f(rect) * step
+			self.mids.append(rect)
+			self.heights.append(self.f(rect))
+			a += step
+			if i % self.PROGRESS_DIVISIONS == self.PROGRESS_DIVISIONS - 1:
+				self.Report("Rectangle", a, s)
+		self.Report("Rectangle", self.b, s)
+		return s
+
+	@Measured
+	def TrapezoidMethod(self):
+		a = self.a
+		step = (self.b - self.a) / self.division
+		s = 0
+		for i in range(self.division):
+			s += 0.5 * (self.f(a) + self.f(a+step)) * step
+			a += step
+			if i % self.PROGRESS_DIVISIONS == self.PROGRESS_DIVISIONS - 1:
+				self.Report("Trapezoid", a, s)
+		self.Report("Trapezoid", self.b, s)
+		return s
+
+	@Measured
+	def FindMaxValue(self):
+		xs = np.linspace(self.a, self.b, 100000)
+		y = self.f(xs) #One vectorized call, big enough for numexpr with a compiled integrand
+		return y.max()
+
+	@Measured
+	def MonteCarlo(self, rng=None):
+		rng = np.random.default_rng() if rng is None else rng
+		a = self.a
+		b = self.b
+		self.y_max = self.FindMaxValue()
+		self.x_dots = rng.uniform(a, b, self.division)
+		self.y_dots = rng.uniform(0, self.y_max, self.division)
+		dots = self.f(self.x_dots)
+		self.hits = (self.y_dots <= dots)
+		count = np.count_nonzero(self.hits)
+		s = (count/self.division) * ((b-a)*self.y_max)
+		self.Report("Monte-Carlo", b, s)
+		return s
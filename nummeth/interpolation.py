@@ -0,0 +1,23 @@
+import numpy as np
+from nummeth.metrics import Measured
+
+#Default function of Lab4
+def f(x):
+	return np.sin(x)
+
+def EquidistantNodes(a, b, count=11):
+	h = (b - a) / (count - 1)
+	return np.array([a + i * h for i in range(count)])
+
+@Measured
+def LagrangePolynomial(x, x_nodes, y_nodes):
+	n = len(x_nodes)
+	L = np.zeros_like(x, dtype=float)
+
+	for i in range(n):
+		li = np.ones_like(x, dtype=float)
+		for j in range(n):
+			if i != j:
+				li *= (x - x_nodes[j]) / (x_nodes[i] - x_nodes[j])
+		L += y_nodes[i] * li
+	return L
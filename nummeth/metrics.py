@@ -0,0 +1,112 @@
+import time
+import threading
+import functools
+import contextlib
+import numpy as np
+
+#Cost of the kernels: wall time, evaluations of f (and df/dy) and iterations of every measured method.
+#Measuring is off by default, a measured method then only pays for one flag check per call.
+#When on, self.f of the measured object is wrapped by a Counter for the duration of the call,
+#and one record per call is kept until Take() or Collect() collects them:
+#  {"kernel": "RootFinder.NewtonsMethod", "time": 1.2e-05, "calls": {"f": 24}, "points": {"f": 24}, "iterations": [5, 5]}
+#Kernels report iterations by setting self.iterations in the measured method.
+#Measuring is switched and recorded per thread, so jobs running on worker threads do not mix their records.
+
+class State(threading.local):
+	enabled = False
+
+	def __init__(self):
+		self.records = []
+
+STATE = State()
+COUNTED = ("f", "dfdy") #Callables of the kernels whose evaluations are counted
+
+def Enable(enabled=True):
+	STATE.enabled = enabled
+
+@contextlib.contextmanager
+def Collect(enabled=True):
+	#Measures the block when enabled and gives its records, the records of other blocks are left alone
+	records = []
+	previous = STATE.enabled
+	start = len(STATE.records)
+	Enable(enabled)
+	try:
+		yield records
+	finally:
+		Enable(previous)
+		records.extend(STATE.records[start:])
+		del STATE.records[start:]
+
+def Take():
+	#Records collected since the last call
+	records = STATE.records[:]
+	STATE.records.clear()
+	return records
+
+class Counter:
+	#Counts the calls of a function and the points it was evaluated at, an array call counts all its points
+
+	def __init__(self, f):
+		self.f = f
+		self.calls = 0
+		self.points = 0
+
+	def __call__(self, *args):
+		self.calls += 1
+		self.points += max([np.size(arg) for arg in args], default=1)
+		return self.f(*args)
+
+def Measured(method):
+	@functools.wraps(method)
+	def wrapper(*args, **kwargs):
+		if not STATE.enabled:
+			return method(*args, **kwargs)
+		return Measure(method, args, kwargs)
+	return wrapper
+
+def Measure(method, args, kwargs):
+	obj = args[0] if args else None
+	wrapped = []
+	counters = {}
+	for name in COUNTED:
+		func = getattr(obj, name, None)
+		if func is None or not callable(func):
+			continue
+		if not isinstance(func, Counter): #Nested measured calls count with the counter of the outer one
+			func = Counter(func)
+			setattr(obj, name, func)
+			wrapped.append(name)
+		counters[name] = (func, func.calls, func.points)
+	start = time.perf_counter()
+	try:
+		result = method(*args, **kwargs)
+	finally:
+		elapsed = time.perf_counter() - start
+		for name in wrapped:
+			setattr(obj, name, counters[name][0].f)
+	record = {"kernel": method.__qualname__, "time": elapsed, "calls": {}, "points": {}}
+	for name, (func, calls, points) in counters.items():
+		record["calls"][name] = func.calls - calls
+		record["points"][name] = func.points - points
+	iterations = obj.__dict__.pop("iterations", None) if hasattr(obj, "__dict__") else None
+	if iterations is not None:
+		record["iterations"] = iterations
+	stats = getattr(obj, "stats", None)
+	if isinstance(stats, dict):
+		record["stats"] = {key: value for key, value in stats.items() if key != "events"}
+	STATE.records.append(record)
+	return result
+
+def FormatRecords(records):
+	lines = []
+	for r in records:
+		cost = ", ".join(f"{name} {calls} calls" + (f" ({r['points'][name]} points)" if r["points"][name] != calls else "")
+			for name, calls in r["calls"].items() if calls)
+		line = f"{r['kernel'].split('.')[-1]}: {r['time']*1e3:.3f} ms"
+		if cost:
+			line += f", {cost}"
+		if "iterations" in r:
+			line += f", iterations {r['iterations']}"
+		lines.append(line)
+	return "\n".join(lines)
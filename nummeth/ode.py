@@ -0,0 +1,704 @@
+import os
+import ast
+import json
+import threading
+import numpy as np
+from nummeth.expr import Expression
+from nummeth.metrics import Measured, Counter
+
+#Default problem of Lab6 and its exact solution
+def f(x, y):
+	return (y * y - y) / x
+
+def dfdy(x, y):
+	return (2 * y - 1) / x
+
+def exact_solution(x, x0, y0):
+	C = (1 - 1 / y0) / x0
+	return 1 / (1 - C * x)
+
+METHOD_NAMES = {
+	1: "Euler method",
+	2: "Runge–Kutta 4",
+	3: "Dormand–Prince 4(5)",
+	4: "Backward Euler",
+	5: "Crank–Nicolson",
+	6: "BDF",
+}
+
+STREAM_LOCKS = {}
+STREAM_LOCKS_LOCK = threading.Lock()
+
+def StreamLock(path):
+	#One lock per stream file, runs of this process that write the same file take turns
+	with STREAM_LOCKS_LOCK:
+		return STREAM_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+class ODESolver:
+	#Solves y' = f(x, y), y(x0) = y0 on [x0, b]. Without dfdy the Jacobian comes from finite differences.
+
+	PROGRESS_STEPS = 2000 #Steps between two progress reports
+
+	def __init__(self, f, dfdy=None, progress=None):
+		#progress("trajectory", (x, y)) gets the steps taken since the last report, without the initial point,
+		#and may stop the run by raising
+		self.f = f
+		self.dfdy = dfdy
+		self.progress = progress
+		self.events = [] #Events registered with AddEvent, checked by every method
+
+	@Measured
+	def Solve(self, method, x0, y0, b, h, atol=1e-6, rtol=1e-6, events=(), stream=None):
+		#Methods: 1 Euler, 2 Runge–Kutta 4, 3 Dormand–Prince, 4 backward Euler, 5 Crank–Nicolson, 6 BDF.
+		#h is the fixed step or the first trial step of an adaptive method. events are checked in this run only,
+		#stream is the .npy path the Euler and Runge–Kutta 4 solutions are written to.
+		if h <= 0:
+			raise ValueError("h must be positive")
+		if method >= 3 and (atol <= 0 or rtol <= 0):
+			raise ValueError("tolerances must be positive")
+		if stream is not None and method not in (1, 2):
+			raise ValueError("streaming is available for Euler and Runge–Kutta 4 only")
+		self.method = method
+		self.SetUpEvents(events)
+		self.reported = 1 #Steps in x_vals already sent to progress
+
+		if method == 3:
+			return self.DormandPrince(x0, y0, b, h, atol, rtol)
+		if method == 4:
+			return self.ThetaMethod(x0, y0, b, h, 1.0, atol, rtol)
+		if method == 5:
+			return self.ThetaMethod(x0, y0, b, h, 0.5, atol, rtol)
+		if method == 6:
+			return self.BDF(x0, y0, b, h, atol, rtol)
+
+		if stream is not None:
+			return self.StreamSolve(stream, x0, y0, b, h)
+
+		n = self.StepCount(x0, b, h)
+		chunks = [np.array([[x0, y0]])]
+		for chunk in self.StepChunks(0, y0, x0, b, h, n, 65536 if self.progress is None else self.PROGRESS_STEPS):
+			chunks.append(chunk)
+			if self.progress is not None:
+				self.progress("trajectory", (chunk[:, 0].copy(), chunk[:, 1].copy()))
+		data = np.concatenate(chunks)
+
+		steps = len(data) - 1
+		self.stats = self.Stats(steps, 0, steps * (1 if method == 1 else 4))
+		return data[:, 0], data[:, 1]
+
+	def Report(self, x_vals, y_vals, force=False):
+		#Sends the steps taken since the last report once there are PROGRESS_STEPS of them
+		if self.progress is not None and len(x_vals) - self.reported >= (1 if force else self.PROGRESS_STEPS):
+			self.progress("trajectory", (np.array(x_vals[self.reported:]), np.array(y_vals[self.reported:])))
+			self.reported = len(x_vals)
+
+	def Jacobian(self, x, y):
+		#Returns df/dy and the number of RHS evaluations spent on it
+		if self.dfdy is not None:
+			return self.dfdy(x, y), 0
+		d = 1e-7 * max(1.0, abs(y))
+		return (self.f(x, y + d) - self.f(x, y - d)) / (2 * d), 2
+
+	def FixedStep(self, x, y, h):
+		if self.method == 1:
+			return y + h * self.f(x, y)
+
+		k1 = self.f(x, y)
+		k2 = self.f(x + h/2, y + h*k1/2)
+		k3 = self.f(x + h/2, y + h*k2/2)
+		k4 = self.f(x + h, y + h*k3)
+		return y + (h / 6) * (k1 + 2*k2 + 2*k3 + k4)
+
+	def StepCount(self, x0, b, h):
+		#Number of fixed steps needed to reach b, without counting a rounding leftover as an extra step
+		return max(0, int(np.ceil((b - x0) / h - 1e-9)))
+
+	def StepChunks(self, start, y, x0, b, h, n, chunk_size=65536):
+		#Generator of fixed steps start+1..n as (m, 2) arrays of (x, y) rows.
+		#x is computed from the step index, so a resumed run lands on the same grid,
+		#and the last step is shortened when h does not divide b - x0, so it ends on b.
+		i = start
+		while i < n:
+			m = min(chunk_size, n - i)
+			chunk = np.empty((m, 2))
+			for j in range(m):
+				x = x0 + (i + j) * h
+				step = h if i + j < n - 1 else b - x
+				y_old = y
+				y = self.FixedStep(x, y, step)
+				chunk[j, 0] = x + step
+				chunk[j, 1] = y
+				if self.active_events:
+					stop = self.CheckEvents(x, y_old, x + step, y, lambda: self.Hermite(x, y_old, x + step, y))
+					if stop is not None:
+						chunk[j] = stop[1:]
+						yield chunk[:j + 1]
+						return
+			i += m
+			yield chunk
+
+	def StreamSolve(self, path, x0, y0, b, h, chunk_size=65536):
+		#Writes the solution to a memory-mapped .npy file chunk by chunk, so memory does not grow with the step count.
+		#After every chunk the last state is saved next to it, and a run with the same parameters resumes from there.
+		#Only a compiled expression can be recognized again, a run of any other f starts over.
+		with StreamLock(path):
+			return self.WriteStream(path, x0, y0, b, h, chunk_size)
+
+	def WriteStream(self, path, x0, y0, b, h, chunk_size):
+		n = self.StepCount(x0, b, h)
+		ckpt_path = path + ".ckpt"
+		params = {"f": self.FunctionKey(), "method": self.method, "x0": x0, "y0": y0, "b": b, "h": h, "n": n,
+			"events": [[event["name"], event.get("level")] for event in self.active_events]}
+
+		start = 0
+		y = y0
+		done = n == 0
+		reused = False
+		ckpt = None
+		if os.path.exists(path) and os.path.exists(ckpt_path):
+			with open(ckpt_path) as file:
+				ckpt = json.load(file)
+		if ckpt is not None and params["f"] is not None and ckpt["params"] == params:
+			out = np.lib.format.open_memmap(path, mode="r+")
+			start = ckpt["index"]
+			y = ckpt["y"]
+			done = ckpt["done"]
+			reused = done #Finished by an earlier run, nothing is left to compute
+		else:
+			#A new file replaces the old one instead of truncating it, another process may still have it mapped
+			temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+			out = np.lib.format.open_memmap(temp, mode="w+", dtype=float, shape=(n + 1, 2))
+			out[0] = (x0, y0)
+			out.flush()
+			os.replace(temp, path)
+			self.SaveCheckpoint(ckpt_path, {"params": params, "index": 0, "y": y0, "done": done})
+
+		i = start
+		if not done:
+			for chunk in self.StepChunks(start, y, x0, b, h, n, chunk_size):
+				out[i + 1:i + 1 + len(chunk)] = chunk
+				i += len(chunk)
+				out.flush()
+				done = i == n or self.event_stop is not None #A terminal event leaves the rest of the file unused
+				self.SaveCheckpoint(ckpt_path, {"params": params, "index": i, "y": float(chunk[-1, 1]), "done": done})
+				if self.progress is not None: #A cancelled run stops after the checkpoint, so it can be resumed
+					view = self.Decimate(chunk, 200)
+					self.progress("trajectory", (view[:, 0], view[:, 1]))
+		del out
+
+		steps = i - start
+		message = f"Solution written to {path}"
+		if reused:
+			message = f"Reused the finished solution in {path}, no steps were computed"
+		elif start > 0:
+			message = f"Resumed from step {start}. " + message
+		if self.event_stop is not None:
+			message = f"Stopped at x = {self.event_stop[1]:.6g} by event '{self.event_stop[0]}'. " + message
+		self.stats = self.Stats(steps, 0, steps * (1 if self.method == 1 else 4), message=message)
+
+		data = self.Decimate(np.load(path, mmap_mode="r")[:i + 1])
+		return data[:, 0], data[:, 1]
+
+	def FunctionKey(self):
+		#Parsed expression of f, None for other functions
+		f = self.f
+		while isinstance(f, Counter): #Measured runs count the calls of f
+			f = f.f
+		if isinstance(f, Expression):
+			return ast.dump(f.tree)
+		return None
+
+	def SaveCheckpoint(self, path, state):
+		#Written to a temporary file first, so an interrupted run never leaves a broken checkpoint
+		temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		with open(temp, "w") as file:
+			json.dump(state, file)
+		os.replace(temp, path)
+
+	def Decimate(self, data, max_points=2000):
+		#Every k-th row of a (possibly memory-mapped) array plus the last one, enough for plotting
+		step = max(1, len(data) // max_points)
+		view = np.array(data[::step])
+		if (len(data) - 1) % step:
+			view = np.vstack((view, data[-1]))
+		return view
+
+	def DormandPrince(self, x0, y0, b, h, atol, rtol):
+		#Embedded Runge–Kutta 5(4) pair with error control, FSAL and 4th order dense output
+		c = self.DP_C
+		A = self.DP_A
+		min_step = 10 * np.finfo(float).eps
+
+		x = x0
+		y = y0
+		k1 = self.f(x, y)
+		nfev = 1
+		accepted = 0
+		rejected = 0
+		message = ""
+
+		x_vals = [x0]
+		y_vals = [y0]
+		slopes = [k1] #f at every point of x_vals
+		dense = [] #(x_old, h, y_old, Q) for every accepted step
+
+		while x < b:
+			h = min(h, b - x)
+			if h < min_step * max(abs(x), 1.0):
+				#The steps collapse at a singularity, whose position is only known to about rtol.
+				#Points closer to it than that may lie beyond it, so they are dropped.
+				#|y/f| is the distance to a simple pole, y = c/(x_pole - x)
+				while len(x_vals) > 1 and abs(y_vals[-1]) < rtol * max(abs(x_vals[-1]), 1.0) * abs(slopes[-1]):
+					x_vals.pop()
+					y_vals.pop()
+					slopes.pop()
+					dense.pop()
+					accepted -= 1
+				self.event_log = [event for event in self.event_log if event[1] <= x_vals[-1]]
+				message = f"Stopped at x = {x_vals[-1]:.6g}: step size underflow (singularity ahead?)"
+				break
+
+			K = [k1]
+			for i in range(1, 6):
+				dy = sum(A[i][j] * K[j] for j in range(i))
+				K.append(self.f(x + c[i] * h, y + h * dy))
+			y_new = y + h * sum(self.DP_B[j] * K[j] for j in range(6))
+			x_new = x + h
+			K.append(self.f(x_new, y_new))
+			nfev += 6
+
+			err = h * sum(self.DP_E[j] * K[j] for j in range(7))
+			scale = atol + rtol * max(abs(y), abs(y_new))
+			err_norm = abs(err) / scale
+
+			if not np.isfinite(err_norm) or not np.isfinite(y_new):
+				rejected += 1
+				h *= 0.2
+				continue
+
+			if err_norm > 1:
+				rejected += 1
+				h *= max(0.2, 0.9 * err_norm ** -0.2)
+				continue
+
+			Q = np.dot(K, self.DP_P)
+			dense.append((x, h, y, Q))
+
+			if self.active_events:
+				stop = self.CheckEvents(x, y, x_new, y_new, lambda: self.DenseStep(x, h, y, Q))
+				if stop is not None:
+					accepted += 1
+					x_vals.append(stop[1])
+					y_vals.append(stop[2])
+					break
+
+			x = x_new
+			y = y_new
+			k1 = K[6] #First Same As Last: the last stage is the next step's first
+			accepted += 1
+			x_vals.append(x)
+			y_vals.append(y)
+			slopes.append(k1)
+			self.Report(x_vals, y_vals)
+
+			if err_norm == 0:
+				h *= 10
+			else:
+				h *= min(10, 0.9 * err_norm ** -0.2)
+
+		self.dense = dense
+		self.dense_start = y0
+		self.Report(x_vals, y_vals, True)
+		self.stats = self.Stats(accepted, rejected, nfev, message=message)
+		return np.array(x_vals), np.array(y_vals)
+
+	def ThetaMethod(self, x0, y0, b, h, theta, atol, rtol):
+		#Fixed step implicit method: theta = 1 is backward Euler, theta = 0.5 is Crank–Nicolson
+		#Each step solves y_new = y + h*(theta*f(x_new, y_new) + (1-theta)*f(x, y)) with Newton's method.
+		#The grid point x0 + i*h is computed from the step index and the last step ends on b.
+		#A step whose Newton iterations do not converge is halved and retried, the halves are kept as extra points.
+		min_step = 10 * np.finfo(float).eps
+		n = self.StepCount(x0, b, h)
+		x = x0
+		y = y0
+		f_old = self.f(x, y)
+		nfev = 1
+		njev = 0
+		nlu = 0
+		rejected = 0
+		message = ""
+
+		x_vals = [x0]
+		y_vals = [y0]
+
+		J = None
+		M = None #Newton matrix 1 - step*theta*J, kept while the step and J stay the same
+		step = h #Length of the next step, shorter than h after a halving
+
+		for i in range(n):
+			end = b if i == n - 1 else x0 + (i + 1) * h
+			while x < end:
+				if step < min_step * max(abs(x), 1.0):
+					message = f"Stopped at x = {x:.6g}: Newton iterations did not converge"
+					break
+				#A rounding leftover before the grid point is not worth a step of its own
+				x_new = end if x + step >= end - min_step * max(abs(end), 1.0) else x + step
+				dx = x_new - x
+				if J is None:
+					J, cost = self.Jacobian(x, y)
+					nfev += cost
+					njev += 1
+					M = None
+				if M is None or M_step != dx:
+					M = 1 - dx * theta * J
+					M_step = dx
+					nlu += 1
+				#The previous value as predictor, explicit Euler overshoots far on stiff problems
+				converged, n_iter, y_new, f_new = self.NewtonTheta(x_new, y, y, f_old, dx, theta, M, atol, rtol)
+				nfev += n_iter
+				if not converged:
+					#Retry with the Jacobian at the last iterate, and once that fails too with half the step
+					y_at = y_new if np.isfinite(y_new) else y
+					J, cost = self.Jacobian(x_new, y_at)
+					nfev += cost
+					njev += 1
+					M = 1 - dx * theta * J
+					nlu += 1
+					converged, n_iter, y_new, f_new = self.NewtonTheta(x_new, y, y, f_old, dx, theta, M, atol, rtol)
+					nfev += n_iter
+				if not converged:
+					rejected += 1
+					step = dx / 2
+					J = None
+					continue
+				if n_iter > self.NEWTON_MAXITER:
+					J = None #Slow convergence, refresh the Jacobian on the next step
+
+				if self.active_events:
+					stop = self.CheckEvents(x, y, x_new, y_new, lambda: self.Hermite(x, y, x_new, y_new, f_old, f_new))
+					if stop is not None:
+						x_vals.append(stop[1])
+						y_vals.append(stop[2])
+						break
+
+				x = x_new
+				y = y_new
+				f_old = f_new
+				x_vals.append(x)
+				y_vals.append(y)
+				self.Report(x_vals, y_vals)
+				step = min(2 * step, h) #Back towards h after a halving
+			else:
+				continue
+			break #Stopped inside the step by an event or by the step underflow
+
+		self.Report(x_vals, y_vals, True)
+		self.stats = self.Stats(len(x_vals) - 1, rejected, nfev, njev, nlu, message)
+		return np.array(x_vals), np.array(y_vals)
+
+	def NewtonTheta(self, x_new, y, y_new, f_old, h, theta, M, atol, rtol):
+		#Simplified Newton iterations with a frozen Newton matrix M
+		tol = max(10 * np.finfo(float).eps / rtol, min(0.03, rtol ** 0.5))
+		dy_norm_old = None
+		f_new = None
+		if M == 0 or not np.isfinite(M):
+			return False, 0, y_new, f_new
+		for k in range(self.NEWTON_MAXITER):
+			f_new = self.f(x_new, y_new)
+			if not np.isfinite(f_new):
+				return False, k + 1, y_new, f_new
+			G = y_new - y - h * (theta * f_new + (1 - theta) * f_old)
+			dy = -G / M
+			dy_norm = abs(dy) / (atol + rtol * abs(y_new))
+			rate = None if dy_norm_old is None else dy_norm / dy_norm_old
+			if rate is not None and rate >= 1:
+				#Corrections that stall below the tolerance are rounding noise at the root, not divergence
+				if dy_norm_old < tol and dy_norm < tol:
+					return True, k + 1, y_new, f_new
+				return False, k + 1, y_new, f_new
+			y_new = y_new + dy
+			if dy_norm == 0 or (rate is not None and rate / (1 - rate) * dy_norm < tol):
+				return True, k + 2, y_new, self.f(x_new, y_new)
+			dy_norm_old = dy_norm
+		return False, self.NEWTON_MAXITER, y_new, f_new
+
+	def BDF(self, x0, y0, b, h, atol, rtol):
+		#Variable order (1-5), variable step backward differentiation formulas.
+		#The solution history is kept as modified divided differences D, which are rescaled when h changes.
+		max_order = 5
+		gamma = np.hstack((0, np.cumsum(1 / np.arange(1, max_order + 1))))
+		error_const = 1 / np.arange(1, max_order + 2)
+		newton_tol = max(10 * np.finfo(float).eps / rtol, min(0.03, rtol ** 0.5))
+		min_step = 10 * np.finfo(float).eps
+
+		x = x0
+		y = y0
+		f0 = self.f(x, y)
+		nfev = 1
+		h = min(h, b - x)
+
+		D = np.zeros(max_order + 3)
+		D[0] = y
+		D[1] = f0 * h
+		order = 1
+		n_equal_steps = 0
+
+		J, cost = self.Jacobian(x, y)
+		nfev += cost
+		njev = 1
+		nlu = 0
+		current_jac = True
+		LU = None
+
+		accepted = 0
+		rejected = 0
+		message = ""
+		x_vals = [x0]
+		y_vals = [y0]
+
+		while x < b:
+			if h < min_step * max(abs(x), 1.0):
+				message = f"Stopped at x = {x:.6g}: step size underflow (singularity ahead?)"
+				break
+			if x + h > b:
+				self.ChangeD(D, order, (b - x) / h)
+				h = b - x
+				n_equal_steps = 0
+				LU = None
+
+			x_new = x + h
+			y_predict = np.sum(D[:order + 1])
+			scale = atol + rtol * abs(y_predict)
+			psi = np.dot(D[1:order + 1], gamma[1:order + 1]) / gamma[order]
+			c = h / gamma[order]
+
+			converged = False
+			while not converged:
+				if LU is None:
+					LU = 1 - c * J #Scalar problem, so the factorization is the Newton matrix itself
+					nlu += 1
+				converged, n_iter, y_new, d = self.NewtonBDF(x_new, y_predict, c, psi, LU, scale, newton_tol)
+				nfev += n_iter
+				if not converged:
+					if current_jac:
+						break
+					J, cost = self.Jacobian(x_new, y_predict)
+					nfev += cost
+					njev += 1
+					current_jac = True
+					LU = None
+
+			if not converged:
+				rejected += 1
+				h *= 0.5
+				self.ChangeD(D, order, 0.5)
+				n_equal_steps = 0
+				LU = None
+				continue
+
+			safety = 0.9 * (2 * self.NEWTON_MAXITER + 1) / (2 * self.NEWTON_MAXITER + n_iter)
+			scale = atol + rtol * abs(y_new)
+			error_norm = abs(error_const[order] * d) / scale
+
+			if error_norm > 1:
+				rejected += 1
+				factor = max(0.2, safety * error_norm ** (-1 / (order + 1)))
+				h *= factor
+				self.ChangeD(D, order, factor)
+				n_equal_steps = 0
+				LU = None
+				continue
+
+			accepted += 1
+			n_equal_steps += 1
+			current_jac = False
+
+			if self.active_events:
+				stop = self.CheckEvents(x, y, x_new, y_new, lambda: self.Hermite(x, y, x_new, y_new))
+				if stop is not None:
+					x_vals.append(stop[1])
+					y_vals.append(stop[2])
+					break
+
+			x = x_new
+			y = y_new
+			x_vals.append(x)
+			y_vals.append(y)
+			self.Report(x_vals, y_vals)
+
+			D[order + 2] = d - D[order + 1]
+			D[order + 1] = d
+			for i in reversed(range(order + 1)):
+				D[i] += D[i + 1]
+
+			if n_equal_steps < order + 1:
+				continue
+
+			#Try the neighbouring orders and take the one that allows the longest step
+			error_m_norm = abs(error_const[order - 1] * D[order]) / scale if order > 1 else np.inf
+			error_p_norm = abs(error_const[order + 1] * D[order + 2]) / scale if order < max_order else np.inf
+			error_norms = np.array([error_m_norm, error_norm, error_p_norm])
+			with np.errstate(divide="ignore"):
+				factors = error_norms ** (-1 / np.arange(order, order + 3))
+
+			order += np.argmax(factors) - 1
+			factor = min(10, safety * np.max(factors))
+			h *= factor
+			self.ChangeD(D, order, factor)
+			n_equal_steps = 0
+			LU = None
+
+		self.Report(x_vals, y_vals, True)
+		self.stats = self.Stats(accepted, rejected, nfev, njev, nlu, message)
+		return np.array(x_vals), np.array(y_vals)
+
+	def NewtonBDF(self, x_new, y_predict, c, psi, LU, scale, tol):
+		d = 0.0
+		y = y_predict
+		dy_norm_old = None
+		for k in range(self.NEWTON_MAXITER):
+			f = self.f(x_new, y)
+			if not np.isfinite(f):
+				break
+			dy = (c * f - psi - d) / LU
+			dy_norm = abs(dy) / scale
+			rate = None if dy_norm_old is None else dy_norm / dy_norm_old
+			if rate is not None and (rate >= 1 or rate ** (self.NEWTON_MAXITER - k) / (1 - rate) * dy_norm > tol):
+				break
+			y += dy
+			d += dy
+			if dy_norm == 0 or (rate is not None and rate / (1 - rate) * dy_norm < tol):
+				return True, k + 1, y, d
+			dy_norm_old = dy_norm
+		return False, k + 1, y, d
+
+	def ChangeD(self, D, order, factor):
+		#Rescales the difference array in place when the step changes from h to factor*h
+		R = self.ComputeR(order, factor)
+		U = self.ComputeR(order, 1)
+		D[:order + 1] = np.dot(np.dot(R, U).T, D[:order + 1])
+
+	def ComputeR(self, order, factor):
+		I = np.arange(1, order + 1)[:, None]
+		J = np.arange(1, order + 1)
+		M = np.zeros((order + 1, order + 1))
+		M[1:, 1:] = (I - 1 - factor * J) / I
+		M[0] = 1
+		return np.cumprod(M, axis=0)
+
+	def Stats(self, accepted, rejected, nfev, njev=0, nlu=0, message=""):
+		if self.event_stop is not None and not message:
+			message = f"Stopped at x = {self.event_stop[1]:.6g} by event '{self.event_stop[0]}'"
+		return {"accepted": accepted, "rejected": rejected, "nfev": nfev + self.event_nfev, "njev": njev, "nlu": nlu,
+			"events": self.event_log, "message": message}
+
+	def AddEvent(self, g, terminal=False, name=None):
+		#Registers g(x, y): every method reports the points where g changes sign, a terminal event also stops the integration there
+		self.events.append({"g": g, "terminal": terminal, "name": name or f"event {len(self.events) + 1}"})
+
+	def ClearEvents(self):
+		self.events = []
+
+	def SetUpEvents(self, events):
+		self.active_events = self.events + list(events)
+		self.event_log = []
+		self.event_stop = None
+		self.event_nfev = 0
+
+	def CheckEvents(self, x_old, y_old, x_new, y_new, interpolant):
+		#Looks for sign changes of every g over an accepted step and locates them on the step's interpolant.
+		#interpolant() is only built when there is a sign change. Returns (name, x, y) of a terminal event or None.
+		found = []
+		u = None
+		for event in self.active_events:
+			g = event["g"]
+			g_old = g(x_old, y_old)
+			g_new = g(x_new, y_new)
+			if g_old == 0 or not g_old * g_new <= 0: #A root at x_old was already reported by the previous step
+				continue
+			if u is None:
+				u = interpolant()
+			if g_new == 0:
+				found.append((x_new, event))
+				continue
+			l = x_old
+			r = x_new
+			precision = 1e-12 * max(1.0, abs(x_new))
+			while abs(r - l) > precision: #Dichotomy on g(x, u(x))
+				c = (l + r) / 2
+				if g_old * g(c, u(c)) > 0:
+					l = c
+				else:
+					r = c
+			found.append(((l + r) / 2, event))
+
+		found.sort(key=lambda item: item[0])
+		for x_e, event in found:
+			y_e = float(y_new if x_e == x_new else u(x_e))
+			x_e = float(x_e)
+			self.event_log.append((event["name"], x_e, y_e))
+			if event["terminal"]:
+				self.event_stop = (event["name"], x_e, y_e)
+				return self.event_stop
+		return None
+
+	def Hermite(self, x0, y0, x1, y1, f0=None, f1=None):
+		#Cubic Hermite interpolant of a step, missing slopes are evaluated here
+		if f0 is None:
+			f0 = self.f(x0, y0)
+			self.event_nfev += 1
+		if f1 is None:
+			f1 = self.f(x1, y1)
+			self.event_nfev += 1
+		h = x1 - x0
+
+		def u(x):
+			t = (x - x0) / h
+			return ((2*t**3 - 3*t**2 + 1) * y0 + (t**3 - 2*t**2 + t) * h * f0
+				+ (-2*t**3 + 3*t**2) * y1 + (t**3 - t**2) * h * f1)
+		return u
+
+	def DenseStep(self, x_old, h, y_old, Q):
+		#Dormand–Prince continuous extension of a single step
+		def u(x):
+			theta = (x - x_old) / h
+			return y_old + h * np.dot(Q, [theta, theta ** 2, theta ** 3, theta ** 4])
+		return u
+
+	def DenseOutput(self, x):
+		#Evaluates the continuous extension of the last Dormand–Prince run at points x
+		if not self.dense: #No step was taken, x0 >= b
+			return np.full(np.shape(x), float(self.dense_start))
+		x_old = np.array([step[0] for step in self.dense])
+		h = np.array([step[1] for step in self.dense])
+		y_old = np.array([step[2] for step in self.dense])
+		Q = np.array([step[3] for step in self.dense])
+
+		idx = np.clip(np.searchsorted(x_old, x, side="right") - 1, 0, len(x_old) - 1)
+		theta = (x - x_old[idx]) / h[idx]
+		powers = np.stack([theta, theta ** 2, theta ** 3, theta ** 4], axis=-1)
+		return y_old[idx] + h[idx] * np.sum(Q[idx] * powers, axis=-1)
+
+	NEWTON_MAXITER = 4
+
+	#Dormand–Prince tableau, error weights and dense output coefficients
+	DP_C = [0, 1/5, 3/10, 4/5, 8/9, 1]
+	DP_A = [
+		[],
+		[1/5],
+		[3/40, 9/40],
+		[44/45, -56/15, 32/9],
+		[19372/6561, -25360/2187, 64448/6561, -212/729],
+		[9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+	]
+	DP_B = [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84]
+	DP_E = [-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40]
+	DP_P = np.array([
+		[1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+		[0, 0, 0, 0],
+		[0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+		[0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+		[0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+		[0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+		[0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+	])
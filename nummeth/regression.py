@@ -0,0 +1,15 @@
+from nummeth.metrics import Measured
+
+@Measured
+def least_squares(x, y):
+	#Slope k and intercept b of the line y = k*x + b fitted to the points
+	n = len(x)
+	sum_x = sum(x)
+	sum_y = sum(y)
+	sum_xy = sum(x[i] * y[i] for i in range(n))
+	sum_x2 = sum(x[i] * x[i] for i in range(n))
+
+	k = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x * sum_x)
+	b = (sum_y - k * sum_x) / n
+
+	return k, b
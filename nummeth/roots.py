@@ -0,0 +1,121 @@
+import numpy as np
+from nummeth.metrics import Measured
+
+#Default equation of Lab1: x*tanh(x)-1=0
+def f(x):
+	return x*np.tanh(x)-1
+
+class RootFinder:
+	#Roots of f(x) = 0 on [a, b] with the given precision.
+	#progress(kind, value) gets the roots found so far by every method and may stop the run by raising.
+
+	def __init__(self, f, precision=1e-4, progress=None):
+		self.f = f
+		self.precision = precision
+		self.progress = progress
+
+	def Report(self, kind, value):
+		if self.progress is not None:
+			self.progress(kind, value)
+
+	def derivative(self, x):
+		return (self.f(x + 1e-5) - self.f(x - 1e-5)) / (2 * (1e-5))
+
+	@Measured
+	def FindRoot(self, a, b):
+		root_intervals = self.ShorteningRootIntervals(a, b)
+		self.Report("intervals", root_intervals)
+		return {
+			"intervals": root_intervals,
+			"iteration": self.IterationMethod(root_intervals),
+			"dichotomy": self.DichotomyMethod(root_intervals),
+			"newton": self.NewtonsMethod(root_intervals),
+		}
+
+	@Measured
+	def ShorteningRootIntervals(self, a, b):
+		#Shortens intervals with roots
+		step = 1 #First step
+		current_intervals = [(a, b)] #Borders
+
+		for i in range(2): #Two times shorts root intervals. First time step = 1.0, second step = 0.1
+			new_intervals = []
+			for (l, r) in current_intervals:
+				a1 = l
+				while a1 < r:
+					a2 = min(a1 + step, r) #Using min so it wouldn't go out of bonds
+					if self.f(a1) * self.f(a2) < 0: #Finds intervals on which sign changes
+						new_intervals.append((a1, a2)) #New interval adds to list
+					elif self.f(a1) == 0:
+						new_intervals.append((a1, a1))
+					elif self.f(a2) == 0:
+						new_intervals.append((a2, a2))
+					a1 = a2
+			current_intervals = new_intervals #Updating list for new cycle
+			step /= 10 #Shortens step from 1 to 0.1
+
+		return [(round(l, 2), round(r, 2)) for (l, r) in current_intervals]
+
+	@Measured
+	def IterationMethod(self, intervals):
+		roots = []
+		step = 0.01
+		self.iterations = 0 #Passes with a ten times smaller step
+		while step >= self.precision:
+			self.iterations += 1
+			new_intervals = []
+			current_roots = []
+			for (l, r) in intervals:
+				a1 = l
+				while a1 < r:
+					a2 = min(a1 + step, r)
+					if self.f(a1) * self.f(a2) < 0:
+						new_intervals.append((a1, a2))
+						current_roots.append((a1 + a2) / 2)
+					elif self.f(a1) == 0:
+						new_intervals.append((a1, a1))
+						current_roots.append((a1 + a1) / 2)
+					elif self.f(a2) == 0:
+						new_intervals.append((a2, a2))
+						current_roots.append((a2 + a2) / 2)
+					a1 = a2
+			intervals = new_intervals
+			roots = current_roots
+			step /= 10
+			self.Report("iteration", roots)
+		return roots
+
+	@Measured
+	def DichotomyMethod(self, intervals):
+		roots = []
+		self.iterations = [] #Halvings for every root
+		for (l, r) in intervals:
+			self.iterations.append(0)
+			while abs(r - l) > self.precision:
+				self.iterations[-1] += 1
+				c = (l + r) / 2 #Creates new point in the center of interval
+				if self.f(l) * self.f(c) < 0: #Finds which half contains root
+					r = c
+				else:
+					l = c
+			roots.append((l + r) / 2)
+			self.Report("dichotomy", roots[:])
+		return roots
+
+	@Measured
+	def NewtonsMethod(self, intervals):
+		roots = []
+		self.iterations = [] #Newton steps for every root
+		for (l, r) in intervals:
+			x = l + self.precision
+			self.iterations.append(0)
+			for i in range(50):
+				self.iterations[-1] += 1
+				x_new = x - self.f(x) / self.derivative(x)
+				if abs(x_new - x) < self.precision or abs(self.f(x_new)) < self.precision:
+					x = x_new
+					break
+				x = x_new
+			roots.append(float(x))
+			self.Report("newton", roots[:])
+		return roots
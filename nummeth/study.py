@@ -0,0 +1,101 @@
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from nummeth import ode, bench
+
+#Convergence order and cost of the fixed step methods on the default problem of Lab6.
+#Run as: python -m nummeth.study --h0 0.1 --count 10 --plot study.png
+
+def StepSizes(h0, ratio, count):
+	#Geometric sequence h0, h0*ratio, h0*ratio**2, ...
+	return [float(h) for h in h0 * ratio ** np.arange(count)]
+
+def RunCase(case):
+	#Runs in a worker process, so it only takes and returns plain values
+	method, h, x0, y0, b = case
+	solver = ode.ODESolver(ode.f)
+	x, y = solver.Solve(method, x0, y0, b, h)
+	error = np.max(np.abs(y - ode.exact_solution(x, x0, y0))) #Global error over the whole grid
+	return {"method": method, "h": h, "steps": solver.stats["accepted"], "nfev": solver.stats["nfev"], "error": float(error)}
+
+def TimeRun(method, h, x0, y0, b, repeat, min_time=0.01):
+	#Best time of one run, as in nummeth.bench. The runs take milliseconds, so short batches are enough
+	solver = ode.ODESolver(ode.f)
+	elapsed, number = bench.TimeCase(lambda: solver.Solve(method, x0, y0, b, h), repeat, min_time)
+	return elapsed
+
+def FitOrder(results, floor=1e-12):
+	#Slope of log(error) against log(h); errors at the rounding floor would flatten it and are left out
+	points = [(r["h"], r["error"]) for r in results if r["error"] > floor]
+	if len(points) < 2:
+		return float("nan")
+	h, error = np.array(points).T
+	slope, intercept = np.polyfit(np.log(h), np.log(error), 1)
+	return float(slope)
+
+def ConvergenceStudy(methods=(1, 2), h0=0.1, ratio=0.5, count=8, x0=1.0, y0=0.5, b=4.0, workers=None, repeat=3):
+	#The errors are computed by worker processes, the times are taken here one case after another,
+	#since runs that share the cores with each other would time the machine load rather than the method
+	cases = [(method, h, x0, y0, b) for method in methods for h in StepSizes(h0, ratio, count)]
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		results = list(pool.map(RunCase, cases))
+	for r in results:
+		r["time"] = TimeRun(r["method"], r["h"], x0, y0, b, repeat)
+	orders = {method: FitOrder([r for r in results if r["method"] == method]) for method in methods}
+	return results, orders
+
+def FormatTable(results, orders):
+	lines = [f"{'method':<16}{'h':>11}{'steps':>9}{'RHS evals':>11}{'time, s':>11}{'error':>11}"]
+	for r in results:
+		lines.append(f"{ode.METHOD_NAMES[r['method']]:<16}{r['h']:>11.3e}{r['steps']:>9}{r['nfev']:>11}"
+			f"{r['time']:>11.3e}{r['error']:>11.3e}")
+	lines.append("")
+	for method, order in orders.items():
+		lines.append(f"Empirical order of {ode.METHOD_NAMES[method]}: {order:.2f}")
+	return "\n".join(lines)
+
+def PlotStudy(results, orders, fig):
+	#Error against step size and against wall-clock time, both on log-log axes
+	ax_h = fig.add_subplot(211)
+	ax_t = fig.add_subplot(212)
+	for method, order in orders.items():
+		rows = [r for r in results if r["method"] == method]
+		h = [r["h"] for r in rows]
+		t = [r["time"] for r in rows]
+		error = [r["error"] for r in rows]
+		ax_h.loglog(h, error, "o-", label=f"{ode.METHOD_NAMES[method]} (order {order:.2f})")
+		ax_t.loglog(t, error, "o-", label=ode.METHOD_NAMES[method])
+	ax_h.set_xlabel("h")
+	ax_h.set_ylabel("global error")
+	ax_t.set_xlabel("time, s")
+	ax_t.set_ylabel("global error")
+	for ax in (ax_h, ax_t):
+		ax.grid(True, which="both", alpha=0.4)
+		ax.legend(fontsize=8)
+	fig.tight_layout()
+
+def main():
+	parser = argparse.ArgumentParser(description="Convergence order and cost study of the Lab6 methods")
+	parser.add_argument("--methods", type=int, nargs="+", default=[1, 2], help="1 Euler, 2 Runge–Kutta 4")
+	parser.add_argument("--h0", type=float, default=0.1)
+	parser.add_argument("--ratio", type=float, default=0.5)
+	parser.add_argument("--count", type=int, default=8)
+	parser.add_argument("--x0", type=float, default=1.0)
+	parser.add_argument("--y0", type=float, default=0.5)
+	parser.add_argument("--b", type=float, default=4.0)
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--plot", help="Save the log-log plot to this file")
+	args = parser.parse_args()
+
+	results, orders = ConvergenceStudy(args.methods, args.h0, args.ratio, args.count,
+		args.x0, args.y0, args.b, args.workers, args.repeat)
+	print(FormatTable(results, orders))
+	if args.plot:
+		from matplotlib.figure import Figure #Only needed for the plot
+		fig = Figure(figsize=(6, 8), dpi=100)
+		PlotStudy(results, orders, fig)
+		fig.savefig(args.plot)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,110 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+#Persistent artists for the lab plots. Every artist is created on first use under a name and updated in place later.
+#The data artists are animated, so they are left out of full draws of the figure and blitted onto the saved
+#background instead. The figure is only drawn again when the layout changes: limits, title, new artists or a resize.
+
+class Plot:
+
+	def __init__(self, canvas, ax):
+		self.canvas = canvas
+		self.ax = ax
+		self.artists = {}
+		self.background = None
+		self.layout_changed = True
+		ax.grid(True)
+		ax.axhline(0, color="black", linewidth=1.0)
+		ax.axvline(0, color="black", linewidth=1.0)
+		self.connection = canvas.mpl_connect("draw_event", self.SaveBackground)
+
+	def Add(self, name, artist):
+		artist.set_animated(True)
+		self.artists[name] = artist
+		self.layout_changed = True
+		return artist
+
+	def Line(self, name, x, y, *fmt, **kwargs):
+		#Non-finite values would break autoscaling, so they are left as gaps
+		y = np.broadcast_to(np.asarray(y, dtype=float), np.shape(x))
+		y = np.where(np.isfinite(y), y, np.nan)
+		if name not in self.artists:
+			line, = self.ax.plot(x, y, *fmt, **kwargs)
+			return self.Add(name, line)
+		line = self.artists[name]
+		line.set_data(x, y)
+		line.set(visible=True, **kwargs)
+		return line
+
+	def VLine(self, name, x, **kwargs):
+		if name not in self.artists:
+			return self.Add(name, self.ax.axvline(x, **kwargs))
+		line = self.artists[name]
+		line.set_xdata([x, x])
+		line.set_visible(True)
+		return line
+
+	def Scatter(self, name, x, y, **kwargs):
+		if name not in self.artists:
+			return self.Add(name, self.ax.scatter(x, y, **kwargs))
+		points = self.artists[name]
+		points.set_offsets(np.column_stack((x, y)))
+		points.set_visible(True)
+		return points
+
+	def Polygons(self, name, verts, **kwargs):
+		#One collection instead of a patch per polygon, thousands of them draw at once
+		if name not in self.artists:
+			return self.Add(name, self.ax.add_collection(PolyCollection(verts, **kwargs)))
+		polygons = self.artists[name]
+		polygons.set_verts(verts)
+		polygons.set_visible(True)
+		return polygons
+
+	def Hide(self, *names):
+		for name in names:
+			if name in self.artists:
+				self.artists[name].set_visible(False)
+
+	def Title(self, text):
+		if self.ax.get_title() != text:
+			self.ax.set_title(text)
+			self.layout_changed = True
+
+	def XLim(self, left=None, right=None):
+		#Fixed x limits, or autoscaling again without them
+		if left is None:
+			self.ax.set_autoscalex_on(True)
+		elif tuple(self.ax.get_xlim()) != (left, right):
+			self.ax.set_xlim(left, right)
+			self.layout_changed = True
+
+	def Update(self, rescale=True, scalex=True):
+		#Blits when only the data changed, draws the whole figure when the limits or the layout changed
+		if rescale:
+			limits = (self.ax.get_xlim(), self.ax.get_ylim())
+			self.ax.relim(visible_only=True)
+			self.ax.autoscale_view(scalex=scalex)
+			if (self.ax.get_xlim(), self.ax.get_ylim()) != limits:
+				self.layout_changed = True
+		if self.layout_changed or self.background is None:
+			self.layout_changed = False
+			self.canvas.draw_idle() #SaveBackground draws the artists on top
+		else:
+			self.canvas.restore_region(self.background)
+			self.DrawArtists()
+			self.canvas.blit(self.canvas.figure.bbox)
+
+	def SaveBackground(self, event):
+		self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+		self.DrawArtists()
+
+	def DrawArtists(self):
+		for artist in self.artists.values():
+			if artist.get_visible():
+				self.ax.draw_artist(artist)
+
+	def Close(self):
+		#Stops drawing on the canvas, for when the axes are replaced
+		self.canvas.mpl_disconnect(self.connection)
+		self.artists.clear()
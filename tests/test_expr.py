@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from nummeth import expr
+from nummeth.expr import Compile, CompileEquation, Differentiate, SameExpression
+
+#Compiled expressions against the same formulas written with NumPy, on both evaluation paths
+
+X_SMALL = np.linspace(0.1, 0.9, 50)
+X_BIG = np.linspace(0.1, 0.9, 2 * expr.NUMEXPR_MIN_SIZE) #Goes to numexpr when it is installed
+
+CASES = [
+	("x*tanh(x)-1", lambda x: x*np.tanh(x) - 1),
+	("1/(sqrt(x**2+1))", lambda x: 1/np.sqrt(x**2 + 1)),
+	("cos(x)/(x+1)", lambda x: np.cos(x)/(x + 1)),
+	("exp(-x)*sin(pi*x)", lambda x: np.exp(-x)*np.sin(np.pi*x)),
+	("log(x)+log10(x)-abs(x-e)", lambda x: np.log(x) + np.log10(x) - np.abs(x - np.e)),
+	("arcsin(x)+arccos(x)+arctan(x)", lambda x: np.arcsin(x) + np.arccos(x) + np.arctan(x)),
+	("sinh(x)*cosh(x)+tan(x)", lambda x: np.sinh(x)*np.cosh(x) + np.tan(x)),
+	("2**x+x**x-+x", lambda x: 2**x + x**x + x*-1),
+]
+
+@pytest.mark.parametrize("text, reference", CASES)
+@pytest.mark.parametrize("x", [X_SMALL, X_BIG], ids=["numpy", "numexpr"])
+def test_values(text, reference, x):
+	np.testing.assert_allclose(Compile(text)(x), reference(x), rtol=1e-12)
+
+@pytest.mark.parametrize("text, reference", CASES)
+def test_scalars(text, reference):
+	for x in (0.3, np.float64(0.7), 1):
+		value = Compile(text)(x)
+		assert type(value) is float
+		assert value == pytest.approx(reference(float(x)), rel=1e-12)
+
+def test_two_variables():
+	f = Compile("(y*y-y)/x", ("x", "y"))
+	np.testing.assert_allclose(f(X_BIG, 0.5), (0.25 - 0.5)/X_BIG)
+	assert f(2.0, 3.0) == 3.0
+
+@pytest.mark.parametrize("x", [X_SMALL, X_BIG], ids=["numpy", "numexpr"])
+def test_constant_has_shape_of_argument(x):
+	assert Compile("2")(x).shape == x.shape
+	assert Compile("2")(0.5) == 2.0
+
+@pytest.mark.parametrize("text, value, expected", [
+	("1/x", 0.0, np.inf),
+	("x+1/0", 1.0, np.inf),
+	("x+10**400", 1.0, np.inf),
+	("x**0.5", -1.0, np.nan),
+])
+def test_no_exceptions(text, value, expected):
+	f = Compile(text)
+	np.testing.assert_equal(f(value), expected)
+	np.testing.assert_equal(f(np.full(3, value)), np.full(3, expected))
+
+@pytest.mark.parametrize("text", ["x+", "x^2", "y", "foo(x)", "sin(x, x)", "__import__('os')", "x.real", "9"*400])
+def test_invalid(text):
+	with pytest.raises(ValueError):
+		Compile(text)
+
+def test_equation():
+	assert CompileEquation("x**2=2")(2.0) == 2.0
+	assert SameExpression("x**2 - 2", "(x**2)-2")
+	with pytest.raises(ValueError):
+		CompileEquation("x=1=2")
+
+@pytest.mark.parametrize("text, reference", CASES)
+def test_derivatives(text, reference):
+	#Symbolic derivative against a central difference of the NumPy formula
+	x = X_SMALL
+	h = 1e-6
+	numeric = (reference(x + h) - reference(x - h)) / (2*h)
+	np.testing.assert_allclose(Differentiate(text, "x")(x), numeric, rtol=1e-6, atol=1e-8)
+
+def test_partial_derivative():
+	dfdy = Differentiate("(y*y-y)/x", "y", ("x", "y"))
+	np.testing.assert_allclose(dfdy(2.0, X_SMALL), (2*X_SMALL - 1)/2.0)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from nummeth.expr import Compile
+from nummeth.ode import ODESolver, f, dfdy, exact_solution
+
+#The default problem of Lab6 on [1, 4], y(1) = 0.5, with the error every method must reach at h = 0.01
+
+X0, Y0, B, H = 1.0, 0.5, 4.0, 0.01
+METHODS = [(1, 1e-2), (2, 1e-9), (3, 1e-5), (4, 1e-2), (5, 1e-5), (6, 1e-4)]
+
+@pytest.mark.parametrize("method, error", METHODS)
+def test_default_problem(method, error):
+	solver = ODESolver(f, dfdy)
+	x, y = solver.Solve(method, X0, Y0, B, H)
+	assert x[0] == X0 and y[0] == Y0
+	assert x[-1] == B
+	assert np.all(np.diff(x) > 0)
+	assert np.max(np.abs(y - exact_solution(x, X0, Y0))) < error
+	assert solver.stats["message"] == ""
+
+@pytest.mark.parametrize("method", [1, 2, 4, 5])
+@pytest.mark.parametrize("h", [0.01, 0.03, 0.7])
+def test_fixed_steps_end_on_b(method, h):
+	#Neither the accumulated x nor a step that does not divide b - x0 may go past b
+	x, y = ODESolver(f, dfdy).Solve(method, X0, Y0, 10.0, h)
+	assert x[-1] == 10.0
+	assert np.all(np.diff(x) > 0)
+
+@pytest.mark.parametrize("method", [4, 5, 6])
+@pytest.mark.parametrize("y0", [0.0, 1.0])
+@pytest.mark.parametrize("h", [0.1, 0.01])
+def test_stiff_nonlinear(method, y0, h):
+	#y' = -1e4*(y**3 - cos x) stays on the slow manifold y = cbrt(cos x) after a short transient
+	g = Compile("-1e4*(y**3 - cos(x))", ("x", "y"))
+	solver = ODESolver(g)
+	x, y = solver.Solve(method, 0.0, y0, 10.0, h)
+	assert solver.stats["message"] == ""
+	assert x[-1] == 10.0
+	assert abs(y[-1] - np.cbrt(np.cos(10.0))) < 1e-3
+
+@pytest.mark.parametrize("method", [1, 2, 3, 4, 5, 6])
+def test_terminal_event(method):
+	#The solution from y(1) = 0.5 is 1/(1 + x), which falls to 0.3 at x = 7/3
+	level = 0.3
+	x_event = 1 / level - 1
+	events = [{"g": lambda x, y: y - level, "terminal": True, "name": "y = 0.3", "level": level}]
+	solver = ODESolver(f, dfdy)
+	x, y = solver.Solve(method, X0, Y0, B, H, events=events)
+	name, x_e, y_e = solver.stats["events"][0]
+	assert name == "y = 0.3"
+	assert x_e == pytest.approx(x_event, abs=20 * dict(METHODS)[method]) #|y'| is about 0.09 at the crossing
+	assert x[-1] == x_e and y[-1] == y_e
+	assert "by event 'y = 0.3'" in solver.stats["message"]
+
+@pytest.mark.parametrize("method", [1, 2])
+def test_stream_resume(method, tmp_path):
+	#A run stopped after its first chunk and resumed gives the file of an uninterrupted run
+	path = str(tmp_path / "solution.npy")
+	g = Compile("(y*y-y)/x", ("x", "y"))
+	x_ref, y_ref = ODESolver(g).Solve(method, X0, Y0, B, 1e-5)
+
+	def Stop(kind, value):
+		raise KeyboardInterrupt()
+	solver = ODESolver(g, progress=Stop)
+	solver.method = method
+	solver.SetUpEvents(())
+	with pytest.raises(KeyboardInterrupt):
+		solver.StreamSolve(path, X0, Y0, B, 1e-5, chunk_size=50000)
+
+	solver = ODESolver(g)
+	x, y = solver.Solve(method, X0, Y0, B, 1e-5, stream=path)
+	assert solver.stats["message"].startswith("Resumed from step 50000.")
+	assert solver.stats["accepted"] == len(x_ref) - 1 - 50000
+	data = np.load(path)
+	np.testing.assert_array_equal(data[:, 0], x_ref)
+	np.testing.assert_array_equal(data[:, 1], y_ref)
+	assert x[-1] == B and y[-1] == y_ref[-1]
+
+@pytest.mark.parametrize("rtol", [1e-3, 1e-6, 1e-9])
+def test_stops_before_pole(rtol):
+	#From y(1) = 2 the solution 1/(1 - x/2) has a pole at x = 2, no point may be taken beyond it
+	solver = ODESolver(f, dfdy)
+	x, y = solver.Solve(3, X0, 2.0, B, H, atol=rtol, rtol=rtol)
+	assert 2.0 - 1e-2 < x[-1] < 2.0
+	assert 0 < y[-1] < np.inf
+	assert "step size underflow" in solver.stats["message"]
+	assert solver.stats["accepted"] == len(x) - 1